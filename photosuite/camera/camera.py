@@ -18,13 +18,20 @@
 """Holds camera settings."""
 
 from typing import Any
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 from photosuite.util.formatter import FilenameFormatter
 
 # pylint: disable=import-error
 from photosuite.camera.util.optionlistmodel import OptionListModel
+from photosuite.camera.util.exposure import SCALES
+from photosuite.camera.util.notify import executor
+from photosuite.camera.util.propertycache import PropertyCache
 from photosuite.camera.errors import CameraError
 from photosuite.camera.cameradriver import CameraDriver
+from photosuite.camera.capturequeue import CaptureQueue
+from photosuite.camera.liveview import LiveView
 
 # pylint: enable=import-error
 
@@ -52,6 +59,17 @@ class Camera:
         ],
     }
 
+    # Time, in seconds, a property value is valid. None means it never
+    # changes during a session. Properties not listed use 'default'.
+    properties_ttl = {
+        "cameramodel": None,
+        "serialnumber": None,
+        "lensname": 10.0,
+        "batterylevel": 30.0,
+        "shuttercounter": 5.0,
+        "default": 2.0,
+    }
+
     def __init__(self, camera_driver: CameraDriver, **options):
         """
         Initialize the camera object.
@@ -66,11 +84,27 @@ class Camera:
                 Control if settings take effect on capture (True) or
                 imediatelly after model changes (False).
                 Default to True
+            - capture_target: string
+                Where captured images are stored, 'sdram' to keep them
+                in the camera RAM until downloaded, or 'card'. Default
+                to the camera setting.
 
         """
         self.__cam = camera_driver
+        if options.get("capture_target") is not None:
+            camera_driver.capture_target = options["capture_target"]
+        self.__cache = PropertyCache(
+            Camera.properties_ttl, Camera.properties_ttl["default"]
+        )
+        self.__queue = None
+        self.__applied = {}
         self.filename_formatter = FilenameFormatter()
         set_on_capture = options.get("set_on_capture", True)
+        # Settings are applied in background, so scrubbing a model does
+        # not wait for the camera.
+        self.__settings = (
+            None if set_on_capture else ThreadPoolExecutor(max_workers=1)
+        )
         self.models = {
             setting: self.__create_setting_model(setting, set_on_capture)
             for setting in ["iso", "shutterspeed", "aperture"]
@@ -80,38 +114,145 @@ class Camera:
         """Create an OptionListModel for camera setting."""
         result = None
         model = self.__cam.get_choices_for(setting)
-        if model is not None:
-            result = OptionListModel(model, getattr(self, setting))
+        if model:
+            result = OptionListModel(
+                model, getattr(self, setting), scale=SCALES.get(setting)
+            )
             if not set_on_capture:
-                result.connect("changed", self._on_setting_change)
+                result.connect(
+                    "changed",
+                    self._on_setting_change,
+                    executor(self.__settings),
+                )
         return result
 
     def _on_setting_change(self, _sender: OptionListModel) -> None:
         """Respond to setting change."""
-        for setting, model in self.models.items():
-            setattr(self, setting, model.value)
+        self.__apply_settings(
+            {
+                setting: model.value
+                for setting, model in self.models.items()
+                if model is not None
+            }
+        )
+
+    def on_config_changed(self, _sender: Any, settings=None) -> None:
+        """
+        Respond to camera configuration changed outside this object.
+
+        Parameters
+        ----------
+        settings: list of string
+            The names of the changed settings. If None, every setting
+            may have changed.
+
+        """
+        if settings is None:
+            self.__forget_settings()
+        elif settings:
+            with self.__cam.lock:
+                for setting in settings:
+                    self.__applied.pop(setting, None)
+            self.__cache.invalidate(*settings)
+
+    def __forget_settings(self):
+        """Discard everything known about camera settings values."""
+        with self.__cam.lock:
+            self.__applied = {}
+        self.__cache.invalidate(volatile_only=True)
+
+    @property
+    def capture_target(self) -> str:
+        """Query where captured images are stored ('sdram' or 'card')."""
+        return self.__cam.capture_target
+
+    @capture_target.setter
+    def capture_target(self, target: str) -> None:
+        """Select where captured images are stored ('sdram' or 'card')."""
+        self.__cam.capture_target = target
+
+    def refresh(self, *names: str) -> None:
+        """
+        Force camera properties to be read again from the camera.
+
+        Parameters
+        ----------
+        names: variable
+            The properties to refresh. If none is given, every property
+            that may change during a session is refreshed.
+
+        """
+        self.__cache.invalidate(*names, volatile_only=not names)
+        for name in names or [None]:
+            self.__cam.invalidate_config(name)
+
+    def __read_property(self, name):
+        """Read a property value from the camera driver."""
+        try:
+            return self.__cam.get_value_for(name)
+        except TypeError:
+            return None
+
+    def __apply_settings(self, settings):
+        """
+        Write changed settings to camera in a single transaction.
+
+        The applied settings are guarded by the camera lock, and the
+        lock is held until the write completes, so settings written by
+        the model executor and by the shutter thread are never seen as
+        applied before they reach the camera.
+        """
+        with self.__cam.lock:
+            delta = {
+                setting: value
+                for setting, value in settings.items()
+                if self.__applied.get(setting) != value
+            }
+            if not delta:
+                return
+            try:
+                self.__cam.set_values(delta)
+            except Exception:
+                self.__forget_settings()
+                raise
+            self.__applied.update(delta)
+        for setting, value in delta.items():
+            self.__cache.set(setting, value)
+
+    def __capture_done(self, request):
+        """Update camera state after a background capture."""
+        self.__cache.invalidate("shuttercounter")
+        if not request.cancelled() and request.exception() is not None:
+            self.__forget_settings()
 
     def __getattr__(self, name: str) -> Any:
         """Overide 'getters' to easily deal with camera properties."""
         props = Camera.properties["config"] + Camera.properties["readonly"]
         if name in props:
-            try:
-                value = self.__cam.get_value_for(name)
-                return value
-            except TypeError:
-                return None
+            return self.__cache.get(name, self.__read_property)
         return getattr(super(), name)
 
     def __setattr__(self, name: str, value: Any) -> None:
         """Overide 'getters' to easily deal with camera properties."""
         props = Camera.properties["config"] + Camera.properties["readonly"]
         if name in props:
-            self.__cam.set_value_for(name, value)
+            self.__apply_settings({name: value})
+            return None
         return super().__setattr__(name, value)
 
+    def __capture_settings(self, values):
+        """Select the settings to apply before a capture."""
+        settings = {}
+        for setting in ["shutterspeed", "aperture", "iso"]:
+            model = self.models.get(setting)
+            value = values.get(setting, model.value if model else None)
+            if value:
+                settings[setting] = value
+        return settings
+
     def grab_frame(self, filename=None, **kwargs):
         """
-        Grab a frame from camera, to a file, or as a BytesIO stream.
+        Grab a frame from camera, to a file, or as a binary stream.
 
         Parameters
         ----------
@@ -131,12 +272,68 @@ class Camera:
         """
         if not self.__cam.can_capture_image():
             raise CameraError("Camera cannot capture images with GPhoto2.")
-        for setting in ["shutterspeed", "aperture", "iso"]:
-            model = self.models.get(setting)
-            value = kwargs.get(setting, model.value if model else None)
-            if value:
-                self.__cam[setting] = value
+        self.__apply_settings(self.__capture_settings(kwargs))
         if filename:
-            filename = self.__cam.capture_to_file(filename)
-            return filename
-        return self.__cam.capture_to_stream()
+            result = self.__cam.capture_to_file(filename)
+        else:
+            result = self.__cam.capture_to_stream()
+        self.__cache.invalidate("shuttercounter")
+        return result
+
+    def grab_frame_async(self, filename=None, callback=None, **kwargs):
+        """
+        Request a frame to be grabbed to a file in background.
+
+        The request is accepted immediately, unless too many frames are
+        pending, and the camera settings are applied right before the
+        shutter is released.
+
+        Parameters
+        ----------
+        filename: string
+            If set, grab image to this file, otherwise the name used by
+            the camera is used.
+        callback: Callable
+            Called with the request future when the frame is saved.
+        shutterspeed: string
+            Camera shutter speed to use.
+        aperture:
+            Camera aperture to use.
+        iso:
+            Camera ISO (light sensitivity) value to use.
+
+        Return
+        ------
+            A Future which result is the name of the saved file.
+
+        """
+        if not self.__cam.can_capture_image():
+            raise CameraError("Camera cannot capture images with GPhoto2.")
+        if self.__queue is None:
+            self.__queue = CaptureQueue(self.__cam)
+            self.__queue.start()
+        # Settings are compared to the applied ones in the shutter
+        # thread, so cancelled requests do not change what is applied.
+        request = self.__queue.submit(
+            filename,
+            callback=callback,
+            before_release=partial(
+                self.__apply_settings, self.__capture_settings(kwargs)
+            ),
+        )
+        request.add_done_callback(self.__capture_done)
+        return request
+
+    def live_view(self, buffer_size=2):
+        """Create a live view engine for the camera."""
+        return LiveView(self.__cam, buffer_size)
+
+    def close(self):
+        """Wait for pending captures and release background resources."""
+        if self.__queue is not None:
+            self.__queue.stop()
+            self.__queue = None
+        if self.__settings is not None:
+            self.__settings.shutdown()
+            self.__settings = None
+        self.__forget_settings()
@@ -17,12 +17,29 @@
 
 """CameraDriver interface."""
 
-from typing import Any
+from enum import Enum
+from typing import Any, Tuple
+
+
+class CameraEvent(Enum):
+    """Events reported by camera drivers."""
+
+    UNKNOWN = 0
+    TIMEOUT = 1
+    FILE_ADDED = 2
+    FOLDER_ADDED = 3
+    CAPTURE_COMPLETE = 4
+    CONFIG_CHANGED = 5
 
 
 class CameraDriver:
     """Define the camera driver interface."""
 
+    @property
+    def lock(self):
+        """Lock that grants exclusive access to the camera."""
+        raise NotImplementedError()
+
     def get_choices_for(self, setting: str) -> list:
         """
         Retrieve list of options for a specific setting.
@@ -50,3 +67,127 @@ class CameraDriver:
 
         """
         raise NotImplementedError()
+
+    def set_value_for(self, setting: str, value: Any) -> None:
+        """
+        Change the camera value for a specific setting.
+
+        Parameters
+        ----------
+        setting: string
+            The setting name.
+        value: Any
+            The new value for the setting.
+
+        """
+        raise NotImplementedError()
+
+    def invalidate_config(self, setting: str = None) -> None:
+        """
+        Force a setting to be read again from the camera.
+
+        Parameters
+        ----------
+        setting: string
+            The setting name. If not set, all settings are invalidated.
+
+        """
+        raise NotImplementedError()
+
+    def set_values(self, settings: dict) -> None:
+        """
+        Change several camera settings in a single transaction.
+
+        Parameters
+        ----------
+        settings: dict
+            Maps setting names to their new values.
+
+        """
+        raise NotImplementedError()
+
+    def can_capture_image(self) -> bool:
+        """Query if the camera can capture images."""
+        raise NotImplementedError()
+
+    def trigger_capture(self) -> Tuple[str, str]:
+        """Release the shutter and return the image (folder, name) on camera."""
+        raise NotImplementedError()
+
+    def download_file(
+        self, folder: str, name: str, filename: str, **kwargs
+    ) -> str:
+        """
+        Transfer an image stored on the camera to a local file.
+
+        The file is only created once it is completely transferred.
+
+        Parameters
+        ----------
+        folder: string
+            The camera folder where the image is stored.
+        name: string
+            The image name on the camera.
+        filename: string
+            The local file name to save the image to.
+        progress: Callable
+            Called with the number of bytes transferred and the file
+            size, after every chunk.
+        chunk_size: int
+            Maximum number of bytes transferred per chunk.
+
+        Return
+        ------
+        The name of the saved file.
+
+        """
+        raise NotImplementedError()
+
+    def capture_to_buffer(self) -> Any:
+        """Capture an image to an ImageBuffer."""
+        raise NotImplementedError()
+
+    def capture_preview(self) -> Tuple[Any, Any]:
+        """
+        Capture a preview (live view) frame.
+
+        Returns an (owner, data) pair, where data supports the buffer
+        protocol and holds the JPEG frame, and owner is the object that
+        owns the frame memory.
+        """
+        raise NotImplementedError()
+
+    @property
+    def capture_target(self) -> str:
+        """Query where captured images are stored ('sdram' or 'card')."""
+        raise NotImplementedError()
+
+    @capture_target.setter
+    def capture_target(self, target: str) -> None:
+        """Select where captured images are stored ('sdram' or 'card')."""
+        raise NotImplementedError()
+
+    def get_file_size(self, folder: str, name: str) -> int:
+        """Retrieve the size, in bytes, of an image stored on the camera."""
+        raise NotImplementedError()
+
+    def delete_file(self, folder: str, name: str) -> None:
+        """Remove an image from the camera storage."""
+        raise NotImplementedError()
+
+    def wait_for_event(self, timeout: int) -> Tuple[CameraEvent, Any]:
+        """
+        Wait for the next camera event.
+
+        Parameters
+        ----------
+        timeout: int
+            Maximum time to wait, in milliseconds.
+
+        Return
+        ------
+        A (CameraEvent, data) pair. For FILE_ADDED and FOLDER_ADDED, data
+        is a (folder, name) pair with the location on the camera.
+
+        """
+        raise NotImplementedError()
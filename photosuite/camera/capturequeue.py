@@ -0,0 +1,181 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Decouple shutter release from image download."""
+
+from concurrent.futures import Future
+from queue import Queue, Full
+from threading import Thread
+
+from photosuite.camera.cameradriver import CameraDriver
+from photosuite.camera.errors import CameraError
+
+
+class CaptureQueue:
+    """
+    Accept capture requests and process them in background threads.
+
+    One thread releases the shutter as soon as a request is available,
+    and another one downloads the captured images, so a new frame can
+    be taken while the previous one is still being transferred.
+    """
+
+    def __init__(self, camera_driver: CameraDriver, max_pending: int = 8):
+        """
+        Initialize the capture queue.
+
+        Parameters
+        ----------
+        camera_driver: CameraDriver
+            The camera driver used to capture and download images.
+        max_pending: int
+            Maximum number of requests waiting for the shutter, and of
+            captured frames waiting for download. When the limit is
+            reached, new requests block (or fail) until there is room.
+
+        """
+        self.__driver = camera_driver
+        self.__shots = Queue(maxsize=max_pending)
+        self.__downloads = Queue(maxsize=max_pending)
+        self.__threads = []
+
+    @property
+    def is_running(self) -> bool:
+        """Query if the background threads are running."""
+        return bool(self.__threads)
+
+    @property
+    def pending(self) -> int:
+        """Query the number of frames not yet saved."""
+        return self.__shots.qsize() + self.__downloads.qsize()
+
+    def start(self) -> None:
+        """Start the background threads."""
+        if not self.is_running:
+            self.__threads = [
+                Thread(target=self.__shutter_loop, daemon=True),
+                Thread(target=self.__download_loop, daemon=True),
+            ]
+            for thread in self.__threads:
+                thread.start()
+
+    def stop(self) -> None:
+        """Stop the background threads, after pending requests finish."""
+        if self.is_running:
+            self.__shots.put(None)
+            for thread in self.__threads:
+                thread.join()
+            self.__threads = []
+
+    def submit(self, filename=None, settings=None, **kwargs) -> Future:
+        """
+        Request a new frame.
+
+        Parameters
+        ----------
+        filename: string or Callable
+            The file to save the image to. If not set, the name used
+            by the camera is used. If callable, it is called with the
+            name used by the camera, and must return the file name.
+        settings: dict
+            Camera settings to apply before releasing the shutter.
+        before_release: Callable
+            Called right before the shutter is released, after settings
+            are applied. If it raises an exception, the frame is not
+            captured.
+        after_release: Callable
+            Called right after the shutter release command returns.
+        callback: Callable
+            Called with the request future when the frame is saved.
+        block: bool
+            Wait for room in the queue if it is full (default: True).
+        timeout: float
+            Maximum time, in seconds, to wait for room in the queue.
+
+        Return
+        ------
+        A Future which result is the name of the saved file.
+
+        """
+        if not self.is_running:
+            raise CameraError("Capture queue is not running.")
+        future = Future()
+        callback = kwargs.get("callback")
+        if callback is not None:
+            future.add_done_callback(callback)
+        request = (
+            future,
+            filename,
+            settings or {},
+            kwargs.get("before_release", lambda: None),
+            kwargs.get("after_release", lambda: None),
+        )
+        try:
+            self.__shots.put(
+                request, kwargs.get("block", True), kwargs.get("timeout")
+            )
+        except Full:
+            raise CameraError("Too many pending captures.") from None
+        return future
+
+    def __shutter_loop(self):
+        """Release the shutter for every request."""
+        while True:
+            request = self.__shots.get()
+            if request is None:
+                self.__downloads.put(None)
+                break
+            future, filename, settings, before_release, after_release = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if settings:
+                    self.__driver.set_values(settings)
+                before_release()
+                folder, name = self.__driver.trigger_capture()
+                after_release()
+            except Exception as ex:  # pylint: disable=broad-except
+                future.set_exception(ex)
+            else:
+                self.__downloads.put((future, folder, name, filename))
+
+    def __download_loop(self):
+        """Download every captured frame."""
+        while True:
+            request = self.__downloads.get()
+            if request is None:
+                break
+            future, folder, name, filename = request
+            try:
+                if callable(filename):
+                    filename = filename(name)
+                filename = self.__driver.download_file(
+                    folder, name, str(filename or name)
+                )
+            except Exception as ex:  # pylint: disable=broad-except
+                future.set_exception(ex)
+            else:
+                future.set_result(filename)
+
+    def __enter__(self):
+        """Start context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Wait for pending requests and stop background threads."""
+        self.stop()
@@ -0,0 +1,142 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Cache libgphoto2 configuration widgets."""
+
+import time
+
+import gphoto2  # pylint: disable=import-error
+
+
+class ConfigCache:
+    """
+    Keep camera configuration widgets, and write back only changed ones.
+
+    Widgets are read and written one at a time, with get_single_config
+    and set_single_config. If the camera does not support it, the whole
+    configuration tree is read once and every widget is taken from it
+    until it expires, and changes are written with a single set_config.
+    The tree is not read again while it has changes not yet written.
+    """
+
+    def __init__(self, camera, context, ttl=None):
+        """
+        Initialize the configuration cache.
+
+        Parameters
+        ----------
+        camera: gphoto2.Camera
+            An initialized camera object.
+        context: gphoto2.Context
+            The context used with the camera.
+        ttl: float (optional)
+            Time, in seconds, a cached widget is considered valid. If
+            not set, widgets are only refreshed through 'invalidate()'.
+
+        """
+        self.__cam = camera
+        self.__ctx = context
+        self.ttl = ttl
+        self.__single = True
+        self.__tree = (None, 0)  # The tree and the time it was read.
+        self.__widgets = {}
+        self.__dirty = {}
+
+    @property
+    def dirty(self):
+        """Query the names of changed widgets not yet written to camera."""
+        return list(self.__dirty.keys())
+
+    def get(self, name):
+        """Retrieve a widget, reading it from the camera if needed."""
+        widget, timestamp = self.__widgets.get(name, (None, 0))
+        if widget is None or self.__expired(timestamp):
+            widget, timestamp = self.__read(name)
+            self.__widgets[name] = (widget, timestamp)
+        return widget
+
+    def set(self, name, value):
+        """
+        Change the value of a widget, without writing it to the camera.
+
+        Returns True if the value was changed, or False if the widget
+        already had the given value.
+        """
+        widget = self.get(name)
+        if widget.get_value() == value:
+            return False
+        widget.set_value(value)
+        self.__dirty[name] = widget
+        return True
+
+    def commit(self):
+        """Write changed widgets to the camera."""
+        if not self.__dirty:
+            return
+        try:
+            if self.__single:
+                for name, widget in self.__dirty.items():
+                    self.__cam.set_single_config(name, widget, self.__ctx)
+            else:
+                self.__cam.set_config(self.__tree[0], self.__ctx)
+        except gphoto2.GPhoto2Error:
+            # Values on camera are unknown, they must be read again.
+            for name in self.__dirty:
+                self.__widgets.pop(name, None)
+            self.__tree = (None, 0)
+            raise
+        finally:
+            self.__dirty.clear()
+
+    def invalidate(self, name=None):
+        """
+        Force a widget, or every widget, to be read again from camera.
+
+        Widgets read one at a time are invalidated individually, but if
+        the camera only supports reading the whole tree, it is read
+        again for any invalidated widget.
+        """
+        names = list(self.__widgets) if name is None else [name]
+        for key in names:
+            if key not in self.__dirty:
+                self.__widgets.pop(key, None)
+        if not self.__dirty:
+            self.__tree = (None, 0)
+
+    def __expired(self, timestamp):
+        """Check if a widget read at 'timestamp' is no longer valid."""
+        return self.ttl is not None and time.monotonic() - timestamp > self.ttl
+
+    def __read(self, name):
+        """Read a widget from camera, returning it and the read time."""
+        if self.__single:
+            try:
+                widget = self.__cam.get_single_config(name, self.__ctx)
+                return widget, time.monotonic()
+            except gphoto2.GPhoto2Error as gpex:
+                if gpex.code != gphoto2.GP_ERROR_NOT_SUPPORTED:
+                    raise
+                # Write widgets read one at a time before using the tree.
+                self.commit()
+                self.__single = False
+        # Changed widgets must be written with the tree they belong to.
+        tree, timestamp = self.__tree
+        if tree is None or (not self.__dirty and self.__expired(timestamp)):
+            self.__tree = (self.__cam.get_config(self.__ctx), time.monotonic())
+            tree, timestamp = self.__tree
+            self.__widgets.clear()
+        return tree.get_child_by_name(name), timestamp
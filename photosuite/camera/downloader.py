@@ -0,0 +1,167 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Download images from camera storage in batches."""
+
+import os
+from dataclasses import dataclass
+from queue import Queue, Empty
+from threading import Thread, current_thread
+
+from photosuite.camera.cameradriver import CameraDriver, CameraEvent
+from photosuite.camera.errors import CameraError
+
+
+@dataclass
+class DownloadOptions:
+    """
+    Options controlling how a BatchDownloader retrieves images.
+
+    Attributes
+    ----------
+    batch_size: int
+        Maximum number of files downloaded per batch.
+    timeout: int
+        Time to wait for camera events, in milliseconds.
+    poll_events: bool
+        Drain FILE_ADDED events from the camera. Set to False if files
+        are added by other means, like an EventPump.
+    delete_after: bool
+        Remove files from camera storage after they are saved and the
+        saved size matches the size on camera.
+
+    """
+
+    batch_size: int = 8
+    timeout: int = 100
+    poll_events: bool = True
+    delete_after: bool = False
+
+
+class BatchDownloader:
+    """
+    Download images added to the camera storage in background.
+
+    Pending FILE_ADDED events are drained from the camera and the files
+    are downloaded back to back. The camera is only held by the driver
+    while each chunk is transferred, so shutter releases are not
+    delayed by a batch of downloads.
+    """
+
+    def __init__(self, camera_driver: CameraDriver, directory: str, **options):
+        """
+        Initialize the downloader.
+
+        Parameters
+        ----------
+        camera_driver: CameraDriver
+            The camera driver used to download images.
+        directory: string
+            The directory where images are saved.
+        options: variable
+            A list of optional configuration options, the ones of
+            DownloadOptions (batch_size, timeout, poll_events and
+            delete_after), and;
+            - filename: Callable
+                Called with the file name on camera, must return the
+                name of the file to save. Default to the same name.
+            - callback: Callable
+                Called with the saved file name, or with a CameraError
+                if the download failed.
+
+        """
+        self.__driver = camera_driver
+        self.directory = directory
+        self.__filename = options.pop("filename", lambda name: name)
+        self.__callback = options.pop("callback", lambda _result: None)
+        self.options = DownloadOptions(**options)
+        self.__pending = Queue()
+        self.__thread = None
+
+    def add(self, folder: str, name: str) -> None:
+        """Schedule the download of an image stored on the camera."""
+        self.__pending.put((folder, name))
+
+    def file_added(self, _sender, location) -> None:
+        """Respond to a 'file_added' notification."""
+        self.add(*location)
+
+    def start(self) -> None:
+        """Start downloading in background."""
+        if self.__thread is None:
+            self.__thread = Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop downloading after the current batch."""
+        thread, self.__thread = self.__thread, None
+        if thread is not None:
+            thread.join()
+
+    def __run(self):
+        """Thread entry point."""
+        # The thread runs until it is no longer the downloader thread.
+        while self.__thread is current_thread():
+            self.download(self.collect())
+
+    def collect(self) -> list:
+        """Retrieve the next batch of files to download."""
+        options = self.options
+        files = []
+        try:
+            if not options.poll_events:
+                files.append(self.__pending.get(timeout=options.timeout / 1000))
+            while len(files) < options.batch_size:
+                files.append(self.__pending.get_nowait())
+        except Empty:
+            pass
+        while options.poll_events and len(files) < options.batch_size:
+            event, data = self.__driver.wait_for_event(options.timeout)
+            if event == CameraEvent.FILE_ADDED:
+                files.append(data)
+            elif event == CameraEvent.TIMEOUT:
+                break
+        return files
+
+    def download(self, files: list) -> None:
+        """Download a batch of files, one after the other."""
+        for folder, name in files:
+            try:
+                result = self.__download_file(folder, name)
+            except Exception as ex:  # pylint: disable=broad-except
+                result = CameraError(f"{folder}/{name}: {ex}")
+            self.__callback(result)
+
+    def __download_file(self, folder, name):
+        """Download a single file, removing it from camera if configured."""
+        filename = os.path.join(self.directory, self.__filename(name))
+        filename = self.__driver.download_file(folder, name, filename)
+        if self.options.delete_after:
+            size = self.__driver.get_file_size(folder, name)
+            if os.path.getsize(filename) != size:
+                raise CameraError(f"Size mismatch saving '{filename}'.")
+            self.__driver.delete_file(folder, name)
+        return filename
+
+    def __enter__(self):
+        """Start context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Stop downloading."""
+        self.stop()
@@ -0,0 +1,122 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Dispatch camera events as notifications."""
+
+from threading import Thread, Event
+
+from photosuite.camera.cameradriver import CameraDriver, CameraEvent
+from photosuite.camera.util.notify import Notifiable
+
+
+class EventPump(Notifiable):
+    """
+    Wait for camera events in background, and notify them.
+
+    Receivers are called with the pump and the event data as arguments:
+        - file_added: (folder, name) of the new file on camera.
+        - folder_added: (folder, name) of the new folder on camera.
+        - capture_complete: event data, if any.
+        - config_changed: the names of the changed settings, empty if
+          the changed property is not a known setting.
+        - error: the exception raised while waiting for an event.
+
+    Receivers are called from the pump thread, unless connected with
+    another dispatcher (see Notifiable).
+    """
+
+    SIGNALS = {
+        CameraEvent.FILE_ADDED: "file_added",
+        CameraEvent.FOLDER_ADDED: "folder_added",
+        CameraEvent.CAPTURE_COMPLETE: "capture_complete",
+        CameraEvent.CONFIG_CHANGED: "config_changed",
+    }
+
+    def __init__(
+        self, camera_driver: CameraDriver, timeout: int = 20, idle: int = 20
+    ):
+        """
+        Initialize the event pump.
+
+        Parameters
+        ----------
+        camera_driver: CameraDriver
+            The camera driver to wait events from.
+        timeout: int
+            Maximum time to wait for each event, in milliseconds. The
+            camera is held by the driver while waiting.
+        idle: int
+            Time, in milliseconds, the camera is left free after a wait
+            with no event, so other threads can use it.
+
+        """
+        super().__init__(connectors=[*EventPump.SIGNALS.values(), "error"])
+        self.__driver = camera_driver
+        self.timeout = timeout
+        self.idle = idle
+        self.__stop = Event()
+        self.__thread = None
+
+    @property
+    def is_running(self) -> bool:
+        """Query if the pump is running."""
+        return self.__thread is not None
+
+    def start(self) -> None:
+        """Start waiting for camera events."""
+        if self.__thread is None:
+            self.__stop.clear()
+            self.__thread = Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop waiting for camera events."""
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self):
+        """Thread entry point."""
+        while not self.__stop.is_set():
+            try:
+                event = self.pump()
+            except Exception as ex:  # pylint: disable=broad-except
+                self._notify(["error"], ex)
+                self.__stop.wait(self.timeout / 1000)
+            else:
+                # Events are drained back to back, but when there are
+                # none the camera lock is not taken again right away.
+                if event == CameraEvent.TIMEOUT:
+                    self.__stop.wait(self.idle / 1000)
+
+    def pump(self) -> CameraEvent:
+        """Wait for a single camera event and notify it."""
+        event, data = self.__driver.wait_for_event(self.timeout)
+        signal = EventPump.SIGNALS.get(event)
+        if signal is not None:
+            self._notify([signal], data)
+        return event
+
+    def __enter__(self):
+        """Start context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Stop waiting for events."""
+        self.stop()
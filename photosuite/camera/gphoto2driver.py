@@ -17,11 +17,17 @@
 
 """Driver for libgphoto2."""
 
-import io
+import os
+import re
+import threading
+
 import gphoto2  # pylint: disable=import-error
 
-from photosuite.camera.cameradriver import CameraDriver
+from photosuite.camera.cameradriver import CameraDriver, CameraEvent
+from photosuite.camera.configcache import ConfigCache
 from photosuite.camera.errors import CameraError
+from photosuite.camera.imagebuffer import ImageBuffer
+from photosuite.util.atomicfile import atomic_write
 
 
 class GPhoto2Error(Exception):
@@ -35,13 +41,50 @@ class GPhoto2Error(Exception):
 class GPhoto2Driver(CameraDriver):
     """Abstract the usage for GPhoto2 with higher level commands."""
 
+    CHUNK_SIZE = 1 << 20
+
+    CAPTURE_TARGETS = {"sdram": "ram", "card": "card"}
+
+    EVENTS = {
+        gphoto2.GP_EVENT_UNKNOWN: CameraEvent.UNKNOWN,
+        gphoto2.GP_EVENT_TIMEOUT: CameraEvent.TIMEOUT,
+        gphoto2.GP_EVENT_FILE_ADDED: CameraEvent.FILE_ADDED,
+        gphoto2.GP_EVENT_FOLDER_ADDED: CameraEvent.FOLDER_ADDED,
+        gphoto2.GP_EVENT_CAPTURE_COMPLETE: CameraEvent.CAPTURE_COMPLETE,
+    }
+
+    # PTP device properties, as reported in "PTP Property XXXX changed"
+    # events, and the settings that expose them.
+    PTP_PROPERTY_CHANGED = re.compile(r"PTP Property ([0-9a-fA-F]{4}) changed")
+    PTP_PROPERTIES = {
+        0x5001: ("batterylevel",),
+        0x5005: ("whitebalance",),
+        0x5007: ("aperture", "f-number"),
+        0x500A: ("focusmode",),
+        0x500B: ("meteringmode", "exposuremetermode"),
+        0x500D: ("shutterspeed", "shutterspeed2"),
+        0x500F: ("iso",),
+        0x5010: ("exposurecompensation",),
+        0x5013: ("drivemode", "capturemode"),
+        # Canon EOS properties.
+        0xD101: ("aperture",),
+        0xD102: ("shutterspeed",),
+        0xD103: ("iso",),
+        0xD104: ("exposurecompensation",),
+        0xD105: ("autoexposuremode",),
+        0xD106: ("drivemode",),
+        0xD107: ("meteringmode",),
+        0xD108: ("focusmode",),
+        0xD109: ("whitebalance",),
+    }
+
     @staticmethod
     def autodetect():
         """Return a list of camera/port pairs."""
         _, cameras = gphoto2.gp_camera_autodetect()
         return tuple(tuple(camport) for camport in cameras)
 
-    def __init__(self, port=None):
+    def __init__(self, port=None, config_ttl=5.0):
         """
         Initialize camera object.
 
@@ -49,12 +92,18 @@ class GPhoto2Driver(CameraDriver):
         ----------
         port: string (optional)
             Optionaly provide the camera port to use.
+        config_ttl: float (optional)
+            Time, in seconds, a configuration value read from camera is
+            considered valid. Configuration change events also force
+            values to be read again. Default to 5 seconds.
 
         """
         self.__port = port
+        self.__config_ttl = config_ttl
         self.__config = None
         self.__cam = None
         self.__ctx = None
+        self.__lock = threading.RLock()
         self.__init_cam()
 
     def __init_cam(self):
@@ -78,7 +127,9 @@ class GPhoto2Driver(CameraDriver):
         else:
             if not self.can_capture_image():
                 raise CameraError("Cannot capture images with this camera.")
-            self.__config = self.__cam.get_config()
+            self.__config = ConfigCache(
+                self.__cam, self.__ctx, self.__config_ttl
+            )
 
     def __invalidate_cam(self):
         """Close camera connection and cleanup object."""
@@ -109,10 +160,16 @@ class GPhoto2Driver(CameraDriver):
     def __get_widget(self, name):
         """Retrieve a camera widget by name."""
         try:
-            return self.__config.get_child_by_name(name)
+            with self.__lock:
+                return self.__config.get(name)
         except Exception:
             raise GPhoto2Error(f"Invalid widget '{name}'") from None
 
+    def invalidate_config(self, setting=None):
+        """Force a setting, or every setting, to be read again from camera."""
+        with self.__lock:
+            self.__config.invalidate(setting)
+
     def get_value_for(self, setting):
         """Retrieve the current value of a camera setting."""
         if not self.is_ready:
@@ -126,11 +183,17 @@ class GPhoto2Driver(CameraDriver):
                 return getattr(abilities, setting)
         raise TypeError(setting)
 
-    def set_value_for(self, name, value):
+    def set_value_for(self, setting, value):
         """Set the value of a camera setting."""
-        widget = self.__get_widget(name)
-        widget.set_value(value)
-        self.__cam.set_config(self.__config)
+        self.set_values({setting: value})
+
+    def set_values(self, settings):
+        """Set several camera settings, writing only the changed ones."""
+        with self.__lock:
+            for name, value in settings.items():
+                self.__get_widget(name)
+                self.__config.set(name, value)
+            self.__config.commit()
 
     def can_capture_image(self):
         """Query if the camera can capture images."""
@@ -143,28 +206,172 @@ class GPhoto2Driver(CameraDriver):
             return abilities.operations & flags != 0
         return False
 
+    def trigger_capture(self):
+        """Release the shutter and return the image location on camera."""
+        with self.__lock:
+            path = self.__cam.capture(gphoto2.GP_CAPTURE_IMAGE, self.__ctx)
+        return path.folder, path.name
+
+    def __get_file(self, folder, name):
+        """Retrieve an image stored on the camera."""
+        with self.__lock:
+            return self.__cam.file_get(
+                folder, name, gphoto2.GP_FILE_TYPE_NORMAL, self.__ctx
+            )
+
+    def download_file(self, folder, name, filename, **kwargs):
+        """
+        Transfer an image stored on the camera to a local file.
+
+        The image is read in chunks, so memory usage does not depend on
+        the file size, and the camera is released between chunks. Data
+        is written to a temporary file, renamed to 'filename' when the
+        transfer is complete.
+
+        Parameters
+        ----------
+        folder: string
+            The camera folder where the image is stored.
+        name: string
+            The image name on the camera.
+        filename: string
+            The local file name to save the image to.
+        progress: Callable
+            Called with the number of bytes transferred and the file
+            size, after every chunk.
+        chunk_size: int
+            Maximum number of bytes transferred per chunk.
+
+        """
+        progress = kwargs.get("progress", lambda _count, _size: None)
+        chunk_size = kwargs.get("chunk_size", GPhoto2Driver.CHUNK_SIZE)
+        size = self.get_file_size(folder, name)
+        received = 0
+        with atomic_write(filename) as descriptor:
+            for chunk in self.__read_chunks(folder, name, size, chunk_size):
+                while chunk:
+                    written = os.write(descriptor, chunk)
+                    chunk = chunk[written:]
+                    received += written
+                progress(received, size)
+        return filename
+
+    def __read_chunks(self, folder, name, size, chunk_size):
+        """Read a file stored on camera in chunks."""
+        view = memoryview(bytearray(chunk_size))
+        offset = 0
+        try:
+            while offset < size:
+                with self.__lock:
+                    count = self.__cam.file_read(
+                        folder,
+                        name,
+                        gphoto2.GP_FILE_TYPE_NORMAL,
+                        offset,
+                        view,
+                        self.__ctx,
+                    )
+                if count <= 0:
+                    raise GPhoto2Error(f"Unexpected end of file: {name}")
+                offset += count
+                yield view[:count]
+        except gphoto2.GPhoto2Error as gpex:
+            if offset > 0 or gpex.code != gphoto2.GP_ERROR_NOT_SUPPORTED:
+                raise
+            # Partial reads not supported, the whole file is retrieved,
+            # and the buffer keeps the CameraFile owning the data alive.
+            file = self.__get_file(folder, name)
+            buffer = ImageBuffer(file, file.get_data_and_size(), name)
+            for start in range(0, len(buffer), chunk_size):
+                yield buffer.data[start : start + chunk_size]
+
+    def capture_preview(self):
+        """Capture a preview frame, without copying its data."""
+        with self.__lock:
+            file = self.__cam.capture_preview(self.__ctx)
+        return file, file.get_data_and_size()
+
+    @property
+    def lock(self):
+        """Lock that grants exclusive access to the camera."""
+        return self.__lock
+
+    def get_file_size(self, folder, name):
+        """Retrieve the size, in bytes, of an image stored on the camera."""
+        with self.__lock:
+            info = self.__cam.file_get_info(folder, name, self.__ctx)
+        return info.file.size
+
+    def delete_file(self, folder, name):
+        """Remove an image from the camera storage."""
+        with self.__lock:
+            self.__cam.file_delete(folder, name, self.__ctx)
+
+    def wait_for_event(self, timeout):
+        """Wait, at most 'timeout' milliseconds, for a camera event."""
+        with self.__lock:
+            evtype, data = self.__cam.wait_for_event(timeout, self.__ctx)
+        event = GPhoto2Driver.EVENTS.get(evtype, CameraEvent.UNKNOWN)
+        changed = GPhoto2Driver.PTP_PROPERTY_CHANGED.search(str(data))
+        if event == CameraEvent.UNKNOWN and changed:
+            # Only the settings changed are read again. Other properties
+            # are left to expire, as some cameras report changes all the
+            # time (e.g. Canon EOS).
+            event = CameraEvent.CONFIG_CHANGED
+            code = int(changed.group(1), 16)
+            data = GPhoto2Driver.PTP_PROPERTIES.get(code, ())
+            for setting in data:
+                self.invalidate_config(setting)
+        elif event in [CameraEvent.FILE_ADDED, CameraEvent.FOLDER_ADDED]:
+            data = (data.folder, data.name)
+        return event, data
+
+    @property
+    def capture_target(self):
+        """Query where captured images are stored ('sdram' or 'card')."""
+        value = self.get_value_for("capturetarget").lower()
+        for target, keyword in GPhoto2Driver.CAPTURE_TARGETS.items():
+            if keyword in value:
+                return target
+        return None
+
+    @capture_target.setter
+    def capture_target(self, target):
+        """
+        Select where captured images are stored.
+
+        Parameters
+        ----------
+        target: string
+            Either 'sdram', to keep images in the camera RAM until they
+            are downloaded, or 'card', to store them on the memory card.
+
+        """
+        keyword = GPhoto2Driver.CAPTURE_TARGETS.get(target)
+        for choice in self.get_choices_for("capturetarget") or []:
+            if keyword is not None and keyword in choice.lower():
+                self.set_value_for("capturetarget", choice)
+                return
+        raise GPhoto2Error(f"Capture target not supported: {target}")
+
     def __capture_from_camera(self):
         """Capture image from camera."""
-        fileinfo = self.__cam.capture(gphoto2.GP_CAPTURE_IMAGE, self.__ctx)
-        filename = fileinfo.name
-        filepath = fileinfo.folder
-        file = self.__cam.file_get(
-            filepath, filename, gphoto2.GP_FILE_TYPE_NORMAL
-        )
-        return fileinfo, file
+        folder, name = self.trigger_capture()
+        return name, self.__get_file(folder, name)
 
     def capture_to_file(self, filename=None):
         """Capture an image to a file."""
-        info, file = self.__capture_from_camera()
-        filename = str(filename or info.name)
-        gphoto2.gp_file_save(file, filename)
-        return filename
+        folder, name = self.trigger_capture()
+        return self.download_file(folder, name, str(filename or name))
+
+    def capture_to_buffer(self):
+        """Capture an image, exposing its data without copying it."""
+        name, file = self.__capture_from_camera()
+        return ImageBuffer(file, file.get_data_and_size(), name)
 
     def capture_to_stream(self):
-        """Capture an image to a BytesIO stream."""
-        _, file = self.__capture_from_camera()
-        _, filedata = gphoto2.gp_file_get_data_and_size(file)
-        return io.BytesIO(filedata)
+        """Capture an image to a binary stream."""
+        return self.capture_to_buffer().open()
 
     def __getitem__(self, name):
         """Allow retrieval of camera settings as object properties."""
@@ -0,0 +1,130 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Expose image data owned by camera drivers without copying it."""
+
+import io
+import os
+
+from photosuite.util.atomicfile import atomic_write
+
+
+class ImageBuffer:
+    """
+    Image data exposed as a read-only memoryview.
+
+    The object owning the memory (e.g. a libgphoto2 CameraFile) is kept
+    alive as long as the buffer exists, so the data is never copied.
+    """
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, owner, data, name=None):
+        """
+        Initialize the image buffer.
+
+        Parameters
+        ----------
+        owner: object
+            The object that owns the image memory.
+        data: buffer
+            An object supporting the buffer protocol, with image data.
+        name: string (optional)
+            The image name, as reported by the camera.
+
+        """
+        self.__owner = owner  # pylint: disable=unused-private-member
+        self.data = memoryview(data).cast("B").toreadonly()
+        self.name = name
+
+    def __len__(self):
+        """Query the image size, in bytes."""
+        return self.data.nbytes
+
+    def open(self):
+        """
+        Open a binary, seekable stream that reads from the buffer.
+
+        The stream keeps a reference to the buffer, so the memory owner
+        stays alive while the stream is in use, even if the buffer
+        itself is discarded.
+        """
+        return io.BufferedReader(MemoryViewReader(self.data, self))
+
+    def write_to(self, descriptor, chunk_size=CHUNK_SIZE):
+        """
+        Write the image data to a file descriptor.
+
+        Parameters
+        ----------
+        descriptor: int
+            A file descriptor opened for writing.
+        chunk_size: int
+            Maximum number of bytes written per call.
+
+        """
+        offset, size = 0, len(self)
+        while offset < size:
+            end = min(offset + chunk_size, size)
+            offset += os.write(descriptor, self.data[offset:end])
+
+    def save(self, filename, chunk_size=CHUNK_SIZE):
+        """Save the image data to a file, atomically."""
+        with atomic_write(filename) as descriptor:
+            self.write_to(descriptor, chunk_size)
+        return filename
+
+
+class MemoryViewReader(io.RawIOBase):
+    """A raw, seekable binary stream over a memoryview."""
+
+    def __init__(self, data, owner=None):
+        """Initialize the stream for a memoryview, and its owner."""
+        super().__init__()
+        self.__owner = owner  # pylint: disable=unused-private-member
+        self.__data = data
+        self.__pos = 0
+
+    def readable(self):
+        """Query if the stream can be read."""
+        return True
+
+    def seekable(self):
+        """Query if the stream supports random access."""
+        return True
+
+    def readinto(self, buffer):
+        """Read data into a pre-allocated buffer."""
+        chunk = self.__data[self.__pos : self.__pos + len(buffer)]
+        size = chunk.nbytes
+        memoryview(buffer).cast("B")[:size] = chunk
+        self.__pos += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Change the stream position."""
+        base = {
+            io.SEEK_SET: 0,
+            io.SEEK_CUR: self.__pos,
+            io.SEEK_END: self.__data.nbytes,
+        }[whence]
+        self.__pos = max(0, base + offset)
+        return self.__pos
+
+    def tell(self):
+        """Query the stream position."""
+        return self.__pos
@@ -0,0 +1,200 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Stream preview frames from camera."""
+
+import time
+from collections import deque
+from threading import Thread, Condition, Event, current_thread
+
+from photosuite.camera.cameradriver import CameraDriver
+from photosuite.camera.imagebuffer import ImageBuffer
+from photosuite.camera.util.notify import Notifiable
+
+
+class PreviewFrame(ImageBuffer):
+    """A JPEG preview frame, exposed as a read-only memoryview."""
+
+    def __init__(self, owner, data, sequence=0):
+        """
+        Initialize the frame.
+
+        Parameters
+        ----------
+        owner: object
+            The object that owns the frame memory. It is kept alive as
+            long as the frame exists.
+        data: buffer
+            An object supporting the buffer protocol, with the frame
+            JPEG data.
+        sequence: int
+            The frame sequence number.
+
+        """
+        super().__init__(owner, data)
+        self.sequence = sequence
+        self.timestamp = time.monotonic()
+
+    @property
+    def age(self):
+        """Query the time, in seconds, since the frame was captured."""
+        return time.monotonic() - self.timestamp
+
+
+class FrameRing:
+    """
+    A bounded buffer of preview frames.
+
+    When the buffer is full, the oldest frame is dropped, so producers
+    never wait for consumers, and consumers always get the newest one.
+    """
+
+    def __init__(self, size=2):
+        """Initialize the buffer for, at most, 'size' frames."""
+        self.__frames = deque(maxlen=size)
+        self.__available = Condition()
+        self.dropped = 0
+
+    def put(self, frame: PreviewFrame) -> None:
+        """Add a frame, dropping the oldest one if the buffer is full."""
+        with self.__available:
+            if len(self.__frames) == self.__frames.maxlen:
+                self.dropped += 1
+            self.__frames.append(frame)
+            self.__available.notify_all()
+
+    def latest(self, timeout=0):
+        """
+        Retrieve the newest frame, discarding older ones.
+
+        Parameters
+        ----------
+        timeout: float
+            Time, in seconds, to wait for a frame if there is none. If
+            None, wait until a frame is available.
+
+        Return
+        ------
+        The newest frame, or None if there is no frame available.
+
+        """
+        with self.__available:
+            if timeout != 0:
+                self.__available.wait_for(lambda: self.__frames, timeout)
+            if not self.__frames:
+                return None
+            self.dropped += len(self.__frames) - 1
+            frame = self.__frames.pop()
+            self.__frames.clear()
+            return frame
+
+
+class LiveView(Notifiable):
+    """
+    Capture preview frames from camera on a dedicated thread.
+
+    If capturing a frame fails, the thread stops, the exception is kept
+    in 'error' and notified to the 'error' receivers, called with the
+    live view and the exception, from the capture thread unless they
+    are connected with another dispatcher. The live view can then be
+    started again.
+    """
+
+    def __init__(self, camera_driver: CameraDriver, buffer_size=2):
+        """
+        Initialize the live view.
+
+        Parameters
+        ----------
+        camera_driver: CameraDriver
+            The camera driver to capture previews from.
+        buffer_size: int
+            Maximum number of frames kept for consumers.
+
+        """
+        super().__init__(connectors=["error"])
+        self.__driver = camera_driver
+        self.frames = FrameRing(buffer_size)
+        self.__stop = Event()
+        self.__thread = None
+        self.__times = deque(maxlen=30)
+        self.latency = 0.0
+        self.error = None
+
+    @property
+    def is_running(self) -> bool:
+        """Query if frames are being captured."""
+        return self.__thread is not None
+
+    @property
+    def fps(self) -> float:
+        """Query the frame rate achieved for the last frames."""
+        times = list(self.__times)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def start(self) -> None:
+        """Start capturing preview frames."""
+        if self.__thread is None:
+            self.__stop.clear()
+            self.__times.clear()
+            self.error = None
+            self.__thread = Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop capturing preview frames."""
+        thread = self.__thread
+        if thread is not None:
+            self.__stop.set()
+            thread.join()
+            self.__thread = None
+
+    def __run(self):
+        """Thread entry point."""
+        try:
+            self.__capture()
+        except Exception as ex:  # pylint: disable=broad-except
+            self.error = ex
+        finally:
+            # The thread is gone, so the live view may be started again.
+            if self.__thread is current_thread():
+                self.__thread = None
+        if self.error is not None:
+            self._notify(["error"], self.error)
+
+    def __capture(self):
+        """Capture frames until stopped."""
+        sequence = 0
+        while not self.__stop.is_set():
+            start = time.monotonic()
+            owner, data = self.__driver.capture_preview()
+            sequence += 1
+            frame = PreviewFrame(owner, data, sequence)
+            self.latency = frame.timestamp - start
+            self.__times.append(frame.timestamp)
+            self.frames.put(frame)
+
+    def __enter__(self):
+        """Start context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Stop capturing preview frames."""
+        self.stop()
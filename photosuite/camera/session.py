@@ -0,0 +1,245 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Drive several cameras at once."""
+
+import os
+import time
+from functools import partial
+from threading import Barrier, BrokenBarrierError
+
+from photosuite.camera.capturequeue import CaptureQueue
+from photosuite.camera.errors import CameraError
+from photosuite.camera.gphoto2driver import GPhoto2Driver, GPhoto2Error
+from photosuite.util.formatter import FilenameFormatter
+from photosuite.util.sequence import get_allocator
+
+
+class SessionCapture:
+    """The frames requested to every camera in a session, for one shot."""
+
+    def __init__(self, requests, releases):
+        """
+        Initialize the object.
+
+        Parameters
+        ----------
+        requests: dict
+            Maps camera names to the Future of their capture request.
+        releases: dict
+            Maps camera names to the (started, returned) times of their
+            shutter release command. It is filled as cameras are
+            released.
+
+        """
+        self.requests = requests
+        self.releases = releases
+
+    @property
+    def skew(self):
+        """
+        Query the time, in seconds, between the first and last release.
+
+        It is measured as the spread of the times the shutter release
+        commands returned, or None if some camera was not released.
+        """
+        releases = self.__complete()
+        if releases is None:
+            return None
+        times = [returned for _, returned in releases]
+        return max(times) - min(times)
+
+    @property
+    def window(self):
+        """
+        Query the time, in seconds, every shutter was released within.
+
+        It is the time from the first release command started to the
+        last one returned, an upper bound of the actual shutter skew.
+        """
+        releases = self.__complete()
+        if releases is None:
+            return None
+        started = min(start for start, _ in releases)
+        returned = max(end for _, end in releases)
+        return returned - started
+
+    def __complete(self):
+        """Retrieve the release times, if every camera was released."""
+        releases = list(self.releases.values())
+        if len(releases) < len(self.requests) or any(
+            end is None for _, end in releases
+        ):
+            return None
+        return releases
+
+    def wait(self, timeout=None):
+        """
+        Wait for every frame to be saved.
+
+        Parameters
+        ----------
+        timeout: float
+            Maximum time, in seconds, to wait for each camera.
+
+        Return
+        ------
+        A dict mapping camera names to the saved file names.
+
+        """
+        return {
+            name: request.result(timeout)
+            for name, request in self.requests.items()
+        }
+
+
+class CameraSession:
+    """
+    Capture images from several cameras in parallel.
+
+    Each camera has its own CaptureQueue, so shutter release and image
+    download run on dedicated threads per camera, with its own libgphoto2
+    context. Shutters are released together, and the files are named
+    with a FilenameFormatter per camera, with the '{camera}' key set to
+    the camera name. One sequence number is allocated for each shot,
+    for the session directory and rule, so the frames of a shot share
+    it, and it is never reused by another process.
+    """
+
+    def __init__(self, drivers, directory=None, **options):
+        """
+        Initialize the session.
+
+        Parameters
+        ----------
+        drivers: dict
+            Maps camera names to their CameraDriver.
+        directory: string
+            The directory where images are saved. Default to the
+            current directory.
+        options: variable
+            A list of optional configuration options;
+            - rename_rule: string
+                The FilenameFormatter rule used to name files.
+                Default to '{camera}_{seq:04}.{ext}'.
+            - max_pending: int
+                Maximum number of pending frames per camera.
+                Default to 8.
+            - sync_timeout: float
+                Maximum time, in seconds, a camera waits for the others
+                before releasing the shutter. Default to 5 seconds.
+
+        """
+        self.cameras = dict(drivers)
+        self.directory = directory or os.getcwd()
+        self.sync_timeout = options.get("sync_timeout", 5.0)
+        self.rename_rule = options.get("rename_rule", "{camera}_{seq:04}.{ext}")
+        self.__sequence = None
+        self.formatters = {}
+        for name in self.cameras:
+            self.formatters[name] = FilenameFormatter(self.rename_rule)
+            self.formatters[name].add_keys({"camera": name})
+        max_pending = options.get("max_pending", 8)
+        self.__queues = {
+            name: CaptureQueue(driver, max_pending)
+            for name, driver in self.cameras.items()
+        }
+
+    @staticmethod
+    def autodetect(directory=None, **options):
+        """Create a session with every detected camera."""
+        drivers = {}
+        for index, (model, port) in enumerate(GPhoto2Driver.autodetect()):
+            driver = GPhoto2Driver(port)
+            try:
+                name = str(driver.get_value_for("serialnumber"))
+            except (TypeError, GPhoto2Error):
+                name = f"{model}-{index}"
+            drivers[name] = driver
+        return CameraSession(drivers, directory, **options)
+
+    def start(self):
+        """Start the capture threads for every camera."""
+        for queue in self.__queues.values():
+            queue.start()
+
+    def stop(self):
+        """Wait for pending frames and stop the capture threads."""
+        for queue in self.__queues.values():
+            queue.stop()
+
+    def capture(self, settings=None, callback=None):
+        """
+        Release the shutter of every camera.
+
+        Parameters
+        ----------
+        settings: dict
+            Camera settings to apply before releasing the shutters.
+        callback: Callable
+            Called with the request future when each frame is saved.
+
+        Return
+        ------
+        A SessionCapture with the requests for every camera.
+
+        """
+        if self.__sequence is None:
+            self.__sequence = get_allocator(self.directory, self.rename_rule)
+        shot = self.__sequence.reserve()
+        barrier = Barrier(len(self.__queues), timeout=self.sync_timeout)
+        releases = {}
+        requests = {
+            name: queue.submit(
+                partial(self.__filename, name, shot),
+                settings,
+                before_release=partial(self.__release, name, barrier, releases),
+                after_release=partial(self.__released, name, releases),
+                callback=callback,
+            )
+            for name, queue in self.__queues.items()
+        }
+        return SessionCapture(requests, releases)
+
+    @staticmethod
+    def __release(name, barrier, releases):
+        """Wait for every camera to be ready, and record release start."""
+        try:
+            barrier.wait()
+        except BrokenBarrierError:
+            raise CameraError("Cameras could not be synchronized.") from None
+        releases[name] = (time.monotonic(), None)
+
+    @staticmethod
+    def __released(name, releases):
+        """Record the time the shutter release command returned."""
+        releases[name] = (releases[name][0], time.monotonic())
+
+    def __filename(self, camera, shot, original):
+        """Create the file name for the image of a shot from a camera."""
+        filename = self.formatters[camera].get_filename(original, seq=shot)
+        filename = self.__sequence.claim_unique(filename)
+        return os.path.join(self.directory, filename)
+
+    def __enter__(self):
+        """Start context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Wait for pending frames and stop capturing."""
+        self.stop()
@@ -0,0 +1,91 @@
+"""Exposure values scales."""
+
+import math
+from functools import lru_cache
+
+# Common exposure steps, in stops.
+THIRD_STOP = 1 / 3
+HALF_STOP = 1 / 2
+FULL_STOP = 1
+
+
+def _number(text):
+    """Convert a decimal or fractional number, or return None."""
+    numerator, _, denominator = text.partition("/")
+    try:
+        value = float(numerator)
+        if denominator:
+            value /= float(denominator)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return value
+
+
+@lru_cache(maxsize=1024)
+def shutter_stops(value):
+    """
+    Convert a shutter speed to stops.
+
+    Accepts values like '1/250', '0.5', '30', '30s' and '1"3' (1.3s).
+    Returns log2 of the exposure time in seconds, or None for values
+    like 'Bulb' and 'Auto'.
+    """
+    text = str(value).strip().lower().replace('"', ".").rstrip(".s")
+    seconds = _number(text)
+    return math.log2(seconds) if seconds and seconds > 0 else None
+
+
+@lru_cache(maxsize=1024)
+def aperture_stops(value):
+    """
+    Convert an aperture to stops.
+
+    Accepts values like 'f/5.6', 'f5.6' and '5.6'. Returns 2 * log2 of
+    the f-number, or None for values like 'Auto' and 'implicit auto'.
+    """
+    text = str(value).strip().lower()
+    if text.startswith("f"):
+        text = text[1:].lstrip("/")
+    fnumber = _number(text)
+    return 2 * math.log2(fnumber) if fnumber and fnumber > 0 else None
+
+
+@lru_cache(maxsize=1024)
+def iso_stops(value):
+    """
+    Convert an ISO speed to stops.
+
+    Returns log2 of the speed relative to ISO 100, or None for values
+    like 'Auto' and 'Hi 1'.
+    """
+    speed = _number(str(value).strip())
+    return math.log2(speed / 100) if speed and speed > 0 else None
+
+
+@lru_cache(maxsize=1024)
+def compensation_stops(value):
+    """
+    Convert an exposure compensation to stops.
+
+    Accepts values like '+1/3', '-0.7', '0' and '+1 2/3'.
+    """
+    text = str(value).strip()
+    sign = -1 if text.startswith("-") else 1
+    stops = 0
+    for part in text.lstrip("+-").split():
+        number = _number(part)
+        if number is None:
+            return None
+        stops += number
+    return sign * stops
+
+
+# Scales for camera settings, as named by libgphoto2.
+SCALES = {
+    "shutterspeed": shutter_stops,
+    "shutterspeed2": shutter_stops,
+    "aperture": aperture_stops,
+    "f-number": aperture_stops,
+    "iso": iso_stops,
+    "exposurecompensation": compensation_stops,
+}
@@ -1,12 +1,69 @@
 """Notify mechanism."""
 
+import weakref
+from functools import partial
+from inspect import ismethod
+from threading import Lock
 from collections.abc import Callable
 
 
+def immediate(call):
+    """Deliver notifications in the thread that raised them."""
+    call()
+
+
+def glib_idle(call):
+    """Deliver notifications in the GLib main loop."""
+    from gi.repository import GLib  # pylint: disable=import-outside-toplevel
+
+    def idle():
+        call()
+        return False
+
+    GLib.idle_add(idle)
+
+
+def asyncio_loop(loop):
+    """Create a dispatcher that delivers notifications in an asyncio loop."""
+    return loop.call_soon_threadsafe
+
+
+def executor(pool):
+    """Create a dispatcher that delivers notifications in an Executor."""
+    return pool.submit
+
+
+class _Receiver:  # pylint: disable=too-few-public-methods
+    """A connected callable, and how it is called."""
+
+    def __init__(self, call, dispatch):
+        """Keep weak references to bound methods, strong to others."""
+        self.target = weakref.WeakMethod(call) if ismethod(call) else None
+        self.call = None if ismethod(call) else call
+        self.dispatch = dispatch
+
+    def get(self):
+        """Retrieve the callable, or None if it no longer exists."""
+        return self.call if self.target is None else self.target()
+
+
 class Notifiable:  # pylint: disable=too-few-public-methods
-    """Implement a basic signaling mechanism."""
+    """
+    Implement a basic signaling mechanism.
+
+    Receivers are called in the order they were connected, through a
+    dispatcher, which may call them immediately (the default) or
+    schedule them in another thread or loop (e.g. 'glib_idle'). Bound
+    methods are referenced weakly, so connecting an object does not keep
+    it alive, and other callables are kept until disconnected.
+
+    Signals listed in 'coalesce' are delivered once for each receiver
+    while a delivery is pending, with the arguments of the latest
+    notification, so a burst of notifications does not queue a call for
+    each one in slow receivers.
+    """
 
-    def __init__(self, connectors=None):
+    def __init__(self, connectors=None, dispatch=immediate, coalesce=()):
         """
         Initialize notification mechanism.
 
@@ -14,15 +71,26 @@ class Notifiable:  # pylint: disable=too-few-public-methods
         ----------
         connectors: list of string
             The list of signals the object exposes.
+        dispatch: Callable
+            The default dispatcher, used for receivers connected
+            without one.
+        coalesce: list of string
+            The signals which notifications are coalesced.
 
         """
         if not (connectors and isinstance(connectors, (tuple, list))):
             raise ValueError(f"Invalid connectors list: {connectors}")
         self.__pins = {}
         for connector in connectors:
-            self.__pins[connector] = set()
+            self.__pins[connector] = ()
+        self.__dispatch = dispatch
+        self.__coalesce = set(coalesce)
+        self.__pending = {}
+        self.__lock = Lock()
 
-    def connect(self, connector: str, call: Callable) -> None:
+    def connect(
+        self, connector: str, call: Callable, dispatch: Callable = None
+    ) -> None:
         """
         Register a callback to a notification connector.
 
@@ -32,13 +100,33 @@ class Notifiable:  # pylint: disable=too-few-public-methods
             The signal name to connect. Any of 'previous', 'next', 'change'.
         call: Callable
             The callable that will be called upon signal notification.
+        dispatch: Callable
+            How the callable is called, e.g. 'immediate', 'glib_idle'.
+            Default to the object dispatcher.
 
         """
         if connector not in self.__pins:
             raise ValueError(f"Connector not found: {connector}")
-        self.__pins[connector].add(call)
+        receiver = _Receiver(call, dispatch or self.__dispatch)
+        with self.__lock:
+            receivers = self.__alive(connector)
+            if all(other.get() != call for other in receivers):
+                self.__pins[connector] = (*receivers, receiver)
 
-    def _notify(self, connectors) -> None:
+    def disconnect(self, connector: str, call: Callable) -> None:
+        """Remove a callback from a notification connector."""
+        with self.__lock:
+            self.__pins[connector] = tuple(
+                receiver
+                for receiver in self.__alive(connector)
+                if receiver.get() != call
+            )
+
+    def __alive(self, connector):
+        """Retrieve receivers which callables still exist."""
+        return tuple(r for r in self.__pins[connector] if r.get() is not None)
+
+    def _notify(self, connectors, *args) -> None:
         """
         Notify all receivers registered for the connectors.
 
@@ -48,8 +136,34 @@ class Notifiable:  # pylint: disable=too-few-public-methods
         ----------
         connectors: list of strings
             Connectors to be notified.
+        args: variable
+            Extra arguments passed to receivers, after the sender.
 
         """
         for connector in connectors:
-            for call in self.__pins[connector]:
-                call(self)
+            coalesce = connector in self.__coalesce
+            for receiver in self.__pins[connector]:
+                if coalesce and receiver.dispatch is not immediate:
+                    self.__post(receiver, args)
+                else:
+                    receiver.dispatch(partial(self.__deliver, receiver, args))
+
+    def __post(self, receiver, args):
+        """Schedule a delivery, unless one is already pending."""
+        with self.__lock:
+            pending = receiver in self.__pending
+            self.__pending[receiver] = args
+        if not pending:
+            receiver.dispatch(partial(self.__flush, receiver))
+
+    def __flush(self, receiver):
+        """Deliver the latest arguments of a coalesced notification."""
+        with self.__lock:
+            args = self.__pending.pop(receiver)
+        self.__deliver(receiver, args)
+
+    def __deliver(self, receiver, args):
+        """Call a receiver, if it still exists."""
+        call = receiver.get()
+        if call is not None:
+            call(self, *args)
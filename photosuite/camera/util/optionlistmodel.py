@@ -1,19 +1,60 @@
 """Camera settings models."""
 
+import logging
+from bisect import bisect_left
+
 from photosuite.camera.util.notify import Notifiable
 
 
 class OptionListModel(Notifiable):
-    """Creates a list model accessible trough indexes or values."""
+    """
+    Creates a list model accessible trough indexes or values.
+
+    If a scale is given, values are also ordered by their position on
+    the scale (e.g. exposure stops), so the valid value nearest to any
+    position can be found, and the current value can be moved by a
+    distance on the scale.
+    """
+
+    def __init__(self, model, value=0, index=-1, scale=None):
+        """
+        Initialize the model object.
 
-    def __init__(self, model, value=0, index=-1):
-        """Initialize the model object."""
-        super().__init__(connectors=["previous", "next", "changed"])
+        Parameters
+        ----------
+        model: list
+            The valid values.
+        value: any
+            The initial value. If it is not a valid value, the nearest
+            value on the scale is used, or the first value, if it is not
+            on the scale.
+        index: int
+            The initial index. If given, 'value' is ignored.
+        scale: Callable
+            Converts a value to its position on a scale, or None for
+            values not on the scale (e.g. 'Auto'). See 'exposure'.
+
+        """
+        super().__init__(
+            connectors=["previous", "next", "changed"], coalesce=["changed"]
+        )
         self.model = model
+        self.scale = scale
+        self.__indexes = {}
+        for i, item in reversed(list(enumerate(model))):
+            self.__indexes[item] = i
+        positions = []
+        if scale is not None:
+            positions = sorted(
+                (scale(item), i)
+                for i, item in enumerate(model)
+                if scale(item) is not None
+            )
+        self.__positions = [position for position, _ in positions]
+        self.__ordered = [i for _, i in positions]
         if index < 0:
-            self.__initial_value(value)
-        else:
-            self.__initial_index(index)
+            index = self.__initial_value(value)
+        self.current = self.__initial_index(index)
 
     @property
     def count(self):
@@ -25,15 +66,28 @@ class OptionListModel(Notifiable):
         """Retrieve the current value associated with the controller."""
         return self.model[self.current]
 
+    @property
+    def position(self):
+        """Retrieve the position of the current value on the scale."""
+        return None if self.scale is None else self.scale(self.value)
+
     def __initial_value(self, value):
-        """Set the current value to closer valid value in the data model."""
+        """Retrieve the index of the closer valid value in the data model."""
         index = self.get_index_from_value(value)
-        self.__initial_index(index)
+        if index < 0:
+            index = self.get_nearest_index(value)
+        if index < 0 < self.count:
+            logging.getLogger(__name__).warning(
+                "Invalid option value %r, using %r.", value, self.model[0]
+            )
+            index = 0
+        return index
 
     def __initial_index(self, index):
-        """Set the current value to the given index."""
-        assert 0 <= index >= 0 < self.count
-        self.current = index
+        """Validate the initial index."""
+        if not 0 <= index < self.count:
+            raise ValueError(f"Invalid index for option list: {index}")
+        return index
 
     def next(self):
         """Advance to next setting value."""
@@ -47,9 +101,75 @@ class OptionListModel(Notifiable):
             self.current -= 1
         self._notify(["previous", "changed"])
 
+    def step(self, stops):
+        """
+        Move the current value by a distance on the scale.
+
+        The current value is set to the valid value nearest to the
+        current position plus 'stops' (e.g. THIRD_STOP, -HALF_STOP).
+        Does nothing if 'stops' is zero, or if the current value is not
+        on the scale.
+        """
+        position = self.position
+        if position is None or stops == 0:
+            return
+        self.current = self.get_index_at(position + stops)
+        self._notify(["next" if stops > 0 else "previous", "changed"])
+
     def get_index_from_value(self, value):
         """Retrieve the index of a value in the given model."""
-        for i, v in enumerate(self.model):  # pylint: disable=invalid-name
-            if value == v:
-                return i
-        return -1
+        return self.__indexes.get(value, -1)
+
+    def get_nearest_index(self, value):
+        """
+        Retrieve the index of the valid value nearest to a value.
+
+        Parameters
+        ----------
+        value: any
+            A value, as the ones in the model (e.g. '1/250', 800).
+
+        Return
+        ------
+        The index of the nearest valid value, or -1 if the value is
+        not on the scale.
+
+        """
+        position = None if self.scale is None else self.scale(value)
+        return self.get_index_at(position)
+
+    def get_index_at(self, position):
+        """
+        Retrieve the index of the valid value nearest to a position.
+
+        Parameters
+        ----------
+        position: float
+            A position on the scale (e.g. exposure stops).
+
+        Return
+        ------
+        The index of the nearest valid value, or -1 if the position is
+        None or there are no values on the scale.
+
+        """
+        if position is None or not self.__positions:
+            return -1
+        where = bisect_left(self.__positions, position)
+        if where == len(self.__positions) or (
+            where > 0
+            and position - self.__positions[where - 1]
+            <= self.__positions[where] - position
+        ):
+            where -= 1
+        return self.__ordered[where]
+
+    def get_nearest(self, value):
+        """Retrieve the valid value nearest to a value, or None."""
+        index = self.get_nearest_index(value)
+        return None if index < 0 else self.model[index]
+
+    def get_at(self, position):
+        """Retrieve the valid value nearest to a position, or None."""
+        index = self.get_index_at(position)
+        return None if index < 0 else self.model[index]
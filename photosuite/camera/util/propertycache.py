@@ -0,0 +1,81 @@
+"""Cache for values read from a device."""
+
+import time
+from collections.abc import Callable
+from threading import Lock
+from typing import Any
+
+
+class PropertyCache:
+    """Keep values for a limited time, per property."""
+
+    def __init__(self, ttl=None, default_ttl=None):
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        ttl: dict
+            Maps property names to the time, in seconds, their values
+            are valid. A time of None means the value never expires.
+        default_ttl: float
+            Time used for properties not in 'ttl'.
+
+        """
+        self.ttl = dict(ttl or {})
+        self.default_ttl = default_ttl
+        self.__values = {}
+        self.__lock = Lock()
+
+    def is_immutable(self, name: str) -> bool:
+        """Query if a property value never expires."""
+        return self.ttl.get(name, self.default_ttl) is None
+
+    def get(self, name: str, read: Callable) -> Any:
+        """
+        Retrieve a property value.
+
+        Parameters
+        ----------
+        name: string
+            The property name.
+        read: Callable
+            Called with the property name if the cached value is missing
+            or expired, must return the current value.
+
+        """
+        with self.__lock:
+            entry = self.__values.get(name)
+        if entry is not None and not self.__expired(name, entry[1]):
+            return entry[0]
+        value = read(name)
+        self.set(name, value)
+        return value
+
+    def set(self, name: str, value: Any) -> None:
+        """Store a property value."""
+        with self.__lock:
+            self.__values[name] = (value, time.monotonic())
+
+    def invalidate(self, *names, volatile_only=False) -> None:
+        """
+        Discard cached values.
+
+        Parameters
+        ----------
+        names: variable
+            The properties to discard. If none is given, all properties
+            are discarded.
+        volatile_only: bool
+            Keep values of properties that never expire.
+
+        """
+        with self.__lock:
+            for name in names or list(self.__values):
+                if not (volatile_only and self.is_immutable(name)):
+                    self.__values.pop(name, None)
+
+    def __expired(self, name, timestamp):
+        """Check if a value read at 'timestamp' is no longer valid."""
+        ttl = self.ttl.get(name, self.default_ttl)
+        return ttl is not None and time.monotonic() - timestamp > ttl
@@ -30,17 +30,20 @@ from gi.repository import Gtk, Gdk  # noqa: E402
 from photosuite.ui.functions import button_with_icon_text  # noqa: E402
 from photosuite.ui.cameracontrolbox import CameraControlBox  # noqa: E402
 from photosuite.ui.filenametemplatedialog import FilenameTemplateDialog  # noqa
+from photosuite.ui.liveviewarea import LiveViewArea  # noqa: E402
 
 from photosuite.camera.camera import Camera  # noqa: E402
 from photosuite.camera.gphoto2driver import GPhoto2Driver  # noqa: E402
+from photosuite.camera.eventpump import EventPump  # noqa: E402
+from photosuite.camera.downloader import BatchDownloader  # noqa: E402
 
 from photosuite.util.formatter import FilenameFormatter  # noqa: E402
 
 # pylint: enable=wrong-import-position, import-error
 
 
-filename_formatter = FilenameFormatter()
 capture_directory = os.getcwd()
+filename_formatter = FilenameFormatter(directory=capture_directory)
 
 
 def create_frame(camera, size=(120, 200)):
@@ -78,6 +81,14 @@ def create_frame(camera, size=(120, 200)):
     )
     button.connect("clicked", grab_picture, camera)
     bbox.pack_start(button, False, False, 0)
+    button = button_with_icon_text(
+        "camera-video",
+        "Live View",
+        Gtk.Orientation.VERTICAL,
+        size=Gtk.IconSize.DIALOG,
+    )
+    button.connect("clicked", live_view_window, camera)
+    bbox.pack_start(button, False, False, 0)
     button = button_with_icon_text(
         "preferences-desktop",
         "Settings",
@@ -91,10 +102,41 @@ def create_frame(camera, size=(120, 200)):
     return frame
 
 
+def capture_filename(original):
+    """Format the full path for a captured image."""
+    filename = filename_formatter.get_filename(original)
+    return os.path.join(capture_directory, filename)
+
+
 def grab_picture(_sender, camera):
-    """Format filename and grab picture from camera."""
-    filename = filename_formatter.get_filename("image.cr2")
-    camera.grab_frame(filename=os.path.join(capture_directory, filename))
+    """Format filename and request a picture from camera."""
+    camera.grab_frame_async(
+        filename=capture_filename("image.cr2"), callback=picture_saved
+    )
+
+
+def picture_saved(request):
+    """Report errors on background captures."""
+    error = request.exception()
+    if error is not None:
+        print(f"Failed to capture image: {error}")
+
+
+def picture_downloaded(result):
+    """Report errors on images downloaded after camera events."""
+    if isinstance(result, Exception):
+        print(f"Failed to download image: {result}")
+
+
+def live_view_window(_sender, camera):
+    """Display the camera live view."""
+    live_view = camera.live_view()
+    window = Gtk.Window()
+    window.set_title("Live View")
+    window.set_default_size(640, 426)
+    window.add(LiveViewArea(live_view))
+    window.show_all()
+    live_view.start()
 
 
 def update_formatter(_sender, *_args):
@@ -126,6 +168,7 @@ def change_target_directory(newdir):
     """Ask user for the new capture directory."""
     global capture_directory  # pylint: disable=global-statement, invalid-name
     capture_directory = newdir or os.getcwd()
+    filename_formatter.directory = capture_directory
 
 
 def set_application_theme():
@@ -141,13 +184,30 @@ def set_application_theme():
 
 def tether_window(_sender, port):
     """Start graphical interface."""
-    camera = Camera(GPhoto2Driver(port[0]))
+    driver = GPhoto2Driver(port[0])
+    camera = Camera(driver)
+    # Images shot with the camera shutter button are downloaded as well.
+    downloader = BatchDownloader(
+        driver,
+        capture_directory,
+        poll_events=False,
+        filename=capture_filename,
+        callback=picture_downloaded,
+    )
+    pump = EventPump(driver)
+    pump.connect("file_added", downloader.file_added)
+    pump.connect("config_changed", camera.on_config_changed)
+    downloader.start()
+    pump.start()
     window = Gtk.Window()
     window.set_title("Tether")
     window.set_resizable(False)
     # width, height = get_screen_dimension()
     width, height = 0, 0
     window.move(width, height)
+    window.connect("destroy", lambda _w: pump.stop())
+    window.connect("destroy", lambda _w: downloader.stop())
+    window.connect("destroy", lambda _w: camera.close())
     window.connect("destroy", Gtk.main_quit)
     window.add(create_frame(camera))
     window.show_all()
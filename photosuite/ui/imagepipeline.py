@@ -0,0 +1,243 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Prepare images to be displayed, in background threads."""
+
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+
+from PIL import Image
+from gi.repository import GdkPixbuf, GLib
+
+from photosuite.camera.imagebuffer import MemoryViewReader
+from photosuite.util.imageformat import ImageFormat, detect
+from photosuite.util.previewcache import PreviewCache
+
+TRANSPOSE = getattr(Image, "Transpose", Image)
+
+
+class DisplayImage:  # pylint: disable=too-few-public-methods
+    """An image ready to be painted."""
+
+    def __init__(self, filename, pixbuf, source_size, sequence):
+        """
+        Initialize the object.
+
+        Parameters
+        ----------
+        filename: string
+            The image file name.
+        pixbuf: GdkPixbuf.Pixbuf
+            The image, scaled to fit the requested size.
+        source_size: tuple
+            The (width, height) of the oriented image at full size.
+        sequence: int
+            The request sequence number, newer requests have greater
+            numbers.
+
+        """
+        self.filename = filename
+        self.pixbuf = pixbuf
+        self.source_size = source_size
+        self.sequence = sequence
+
+
+class ImagePipeline:
+    """
+    Decode, orient and scale images using a pool of threads.
+
+    Each image goes through the stages: format detection, metadata
+    extraction, decoding at a reduced size, orientation and scaling to
+    the requested size. If a preview cache is used, images are decoded
+    from the smallest cached version large enough, and versions are
+    built in background for images not yet in the cache.
+    """
+
+    PIL_FORMATS = (
+        ImageFormat.JPEG,
+        ImageFormat.TIFF,
+        ImageFormat.GIF,
+        ImageFormat.PNG,
+    )
+    ORIENTATION = {
+        3: TRANSPOSE.ROTATE_180,
+        6: TRANSPOSE.ROTATE_270,
+        8: TRANSPOSE.ROTATE_90,
+    }
+
+    def __init__(self, metadata, exiftool, **options):
+        """
+        Initialize the pipeline.
+
+        Parameters
+        ----------
+        metadata: MetadataCache
+            Used to retrieve image metadata. Must be thread-safe.
+        exiftool: ExifToolPool
+            Used to retrieve previews embedded in RAW files. Must be
+            thread-safe.
+        options: variable
+            A list of optional configuration options;
+            - workers: int
+                Number of worker threads. Default to the number of
+                CPUs, up to 4.
+            - max_in_flight: int
+                Maximum number of images being processed. When reached,
+                'submit' waits for an image to complete. Default to
+                twice the number of workers.
+            - previews: dict
+                Options for a PreviewCache, see its documentation.
+                Default to None, not using a preview cache.
+
+        """
+        self.__metadata = metadata
+        self.__exiftool = exiftool
+        workers = options.get("workers", min(4, os.cpu_count() or 1))
+        self.__executor = ThreadPoolExecutor(max_workers=workers)
+        self.__slots = BoundedSemaphore(
+            options.get("max_in_flight", 2 * workers)
+        )
+        self.__sequence = itertools.count(1)
+        previews = options.get("previews")
+        self.previews = (
+            None if previews is None else PreviewCache(self.load, **previews)
+        )
+
+    def submit(self, filename, size, callback=None, block=True):
+        """
+        Request an image to be prepared for display.
+
+        Parameters
+        ----------
+        filename: string
+            The image file name.
+        size: tuple
+            The (width, height) of the area the image will be painted.
+        callback: Callable
+            Called with the request future when the image is ready.
+        block: bool
+            Wait for an image to complete if too many are being
+            processed. If False, the request is dropped instead.
+
+        Return
+        ------
+        A Future which result is a DisplayImage, or None if the file is
+        not an image. None if the request was dropped.
+
+        """
+        # pylint: disable=consider-using-with
+        if not self.__slots.acquire(blocking=block):
+            return None
+        sequence = next(self.__sequence)
+        request = self.__executor.submit(self.process, filename, size, sequence)
+        request.add_done_callback(lambda _request: self.__slots.release())
+        if callback is not None:
+            request.add_done_callback(callback)
+        return request
+
+    def shutdown(self):
+        """Wait for pending images and stop the worker threads."""
+        self.__executor.shutdown()
+        if self.previews is not None:
+            self.previews.shutdown()
+
+    def process(self, filename, size, sequence=0):
+        """Run every stage of the pipeline for an image."""
+        image_format = self.sniff(filename)
+        if not image_format.is_image:
+            return None
+        transpose = self.orientation(filename)
+        rotated = transpose in [TRANSPOSE.ROTATE_90, TRANSPOSE.ROTATE_270]
+        size = tuple(size[::-1] if rotated else size)
+        image, source_size = self.decode(filename, image_format, size)
+        # Scaling before orienting leaves less data to be transposed.
+        image.thumbnail(size)
+        if transpose is not None:
+            image = image.transpose(transpose)
+        if rotated:
+            source_size = source_size[::-1]
+        return DisplayImage(filename, to_pixbuf(image), source_size, sequence)
+
+    @staticmethod
+    def sniff(filename):
+        """Detect the file ImageFormat."""
+        return detect(filename)
+
+    def orientation(self, filename):
+        """Retrieve the transposition needed to display the image upright."""
+        key = "EXIF:Orientation"
+        metadata = self.__metadata.get_metadata(filename, tags=[key])
+        value = metadata[0].get(key) if metadata else None
+        return ImagePipeline.ORIENTATION.get(int(value or 1))
+
+    def decode(self, filename, image_format, size):
+        """
+        Decode an image, at a reduced size when possible.
+
+        JPEG images (and RAW previews) are decoded with DCT scaling to
+        the smallest size not smaller than 'size'. On a preview cache
+        miss, the image is decoded large enough to build the cache entry
+        from it. Returns the decoded image and its full size.
+        """
+        cached = None
+        if self.previews is not None:
+            cached = self.previews.get(filename, size)
+        if cached is None:
+            image = self.load(filename, image_format)
+            source_size = image.size
+        else:
+            image = Image.open(cached[0])
+            source_size = cached[1]
+        draft = size
+        if cached is None and self.previews is not None:
+            # Decode once, large enough to build the cache entry too.
+            largest = self.previews.sizes[-1]
+            draft = (max(size[0], largest), max(size[1], largest))
+        image.draft("RGB", draft)
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.mode else "RGB")
+        if cached is None and self.previews is not None:
+            self.previews.schedule(filename, image.copy(), source_size)
+        return image, source_size
+
+    def load(self, filename, image_format=None):
+        """Open an image, or the preview embedded in a RAW file."""
+        if image_format is None:
+            image_format = self.sniff(filename)
+        if image_format in ImagePipeline.PIL_FORMATS:
+            return Image.open(filename)
+        preview = self.__exiftool.get_image_preview(filename)
+        return Image.open(MemoryViewReader(memoryview(preview)))
+
+
+def to_pixbuf(image):
+    """Create a GdkPixbuf from the pixels of a PIL RGB or RGBA image."""
+    has_alpha = image.mode == "RGBA"
+    width, height = image.size
+    channels = 4 if has_alpha else 3
+    return GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes.new(image.tobytes()),
+        GdkPixbuf.Colorspace.RGB,
+        has_alpha,
+        8,
+        width,
+        height,
+        width * channels,
+    )
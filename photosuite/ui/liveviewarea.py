@@ -0,0 +1,96 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Display camera live view frames."""
+
+from gi.repository import Gtk, Gdk, GdkPixbuf, GLib
+
+from photosuite.camera.util.notify import glib_idle
+
+
+class LiveViewArea(Gtk.DrawingArea):
+    """A drawing area that displays the newest live view frame."""
+
+    def __init__(self, live_view, fps=30):
+        """
+        Initialize the widget.
+
+        Parameters
+        ----------
+        live_view: LiveView
+            The live view engine frames are taken from.
+        fps: int
+            Maximum number of redraws per second.
+
+        """
+        Gtk.DrawingArea.__init__(self)
+        self.live_view = live_view
+        self.__pixbuf = None
+        self.__sequence = 0
+        self.connect("draw", self.__draw)
+        self.connect("destroy", self.__destroy)
+        live_view.connect("error", self.on_error, glib_idle)
+        self.__timer = GLib.timeout_add(1000 // fps, self.update)
+
+    def on_error(self, _sender, error):
+        """Report a live view failure, keeping the last frame."""
+        self.set_tooltip_text(f"Live view stopped: {error}")
+
+    def update(self):
+        """Decode the newest frame, if there is a new one."""
+        frame = self.live_view.frames.latest()
+        if frame is not None and frame.sequence > self.__sequence:
+            self.__sequence = frame.sequence
+            loader = GdkPixbuf.PixbufLoader.new_with_type("jpeg")
+            try:
+                # The loader needs its own copy, this is the only one made.
+                loader.write(frame.data.tobytes())
+                loader.close()
+                self.__pixbuf = loader.get_pixbuf()
+            except GLib.Error:
+                return True  # Skip corrupted frames.
+            self.set_tooltip_text(
+                f"{self.live_view.fps:.1f} fps, "
+                f"{1000 * self.live_view.latency:.0f} ms"
+            )
+            self.queue_draw()
+        return True
+
+    def __draw(self, _widget, cairo_context):
+        """Paint the last decoded frame, scaled to the widget size."""
+        if self.__pixbuf is not None:
+            data = self.__pixbuf
+            # pylint: disable=invalid-name
+            iw, ih = data.get_width(), data.get_height()
+            w = self.get_allocated_width()
+            h = self.get_allocated_height()
+            r = min(w / iw, h / ih)
+            rw, rh = max(1, int(iw * r)), max(1, int(ih * r))
+            if (rw, rh) != (iw, ih):
+                interp = GdkPixbuf.InterpType.BILINEAR
+                data = data.scale_simple(rw, rh, interp)
+            Gdk.cairo_set_source_pixbuf(
+                cairo_context, data, (w - rw) // 2, (h - rh) // 2
+            )
+            cairo_context.paint()
+            # pylint: enable=invalid-name
+        return False
+
+    def __destroy(self, _widget):
+        """Stop updating the widget."""
+        GLib.source_remove(self.__timer)
+        self.live_view.stop()
@@ -0,0 +1,108 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Keep scaled copies of an image for painting."""
+
+from collections import OrderedDict
+
+from gi.repository import Gdk, GdkPixbuf
+
+
+class RenderCache:
+    """
+    Keep scaled versions of a pixbuf, for the sizes it is painted at.
+
+    Images are never scaled up. A new version is scaled from the
+    smallest cached version that is large enough, and cached versions
+    are only discarded when the source image changes, or when there are
+    more than 'levels' of them.
+    """
+
+    def __init__(self, levels=4, interpolation=GdkPixbuf.InterpType.BILINEAR):
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        levels: int
+            Maximum number of scaled versions kept.
+        interpolation: GdkPixbuf.InterpType
+            The interpolation used to scale the image.
+
+        """
+        self.levels = levels
+        self.interpolation = interpolation
+        self.__source = None
+        self.__scaled = OrderedDict()
+
+    @property
+    def source(self):
+        """Retrieve the source image."""
+        return self.__source
+
+    @source.setter
+    def source(self, pixbuf):
+        """Change the source image, discarding scaled versions."""
+        if pixbuf is not self.__source:
+            self.__source = pixbuf
+            self.__scaled.clear()
+
+    def get(self, width, height):
+        """Retrieve the source image scaled to fit in (width, height)."""
+        if self.__source is None:
+            return None
+        size = self.__fit(width, height)
+        pixbuf = self.__scaled.get(size)
+        if pixbuf is None:
+            pixbuf = self.__base(size).scale_simple(*size, self.interpolation)
+            self.__scaled[size] = pixbuf
+            while len(self.__scaled) > self.levels:
+                self.__scaled.popitem(last=False)
+        self.__scaled.move_to_end(size)
+        return pixbuf
+
+    def paint(self, cairo_context, width, height):
+        """Paint the image centered in an area of (width, height)."""
+        pixbuf = self.get(width, height)
+        if pixbuf is not None:
+            # pylint: disable=invalid-name
+            x = (width - pixbuf.get_width()) // 2
+            y = (height - pixbuf.get_height()) // 2
+            Gdk.cairo_set_source_pixbuf(cairo_context, pixbuf, x, y)
+            cairo_context.paint()
+            # pylint: enable=invalid-name
+
+    def __fit(self, width, height):
+        """Compute the size of the source image fitted to an area."""
+        src_width = self.__source.get_width()
+        src_height = self.__source.get_height()
+        ratio = min(1.0, width / src_width, height / src_height)
+        return (
+            max(1, int(src_width * ratio)),
+            max(1, int(src_height * ratio)),
+        )
+
+    def __base(self, size):
+        """Select the smallest version that can be scaled to 'size'."""
+        larger = [
+            pixbuf
+            for (width, height), pixbuf in self.__scaled.items()
+            if width >= size[0] and height >= size[1]
+        ]
+        return min(
+            larger, key=lambda pixbuf: pixbuf.get_width(), default=self.__source
+        )
@@ -0,0 +1,99 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Write files so that readers never see them partially written."""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+
+
+@contextmanager
+def atomic_write(filename, mode=0o666):
+    """
+    Create a file through a temporary file, renamed when it is complete.
+
+    The temporary file is created in the same directory as 'filename',
+    flushed to disk and renamed over it when the context exits without
+    errors. If an exception is raised, the temporary file is removed
+    and 'filename' is left untouched.
+
+    Parameters
+    ----------
+    filename: string
+        The name of the file to create.
+    mode: int
+        The permissions of the new file, subject to the process umask.
+
+    Return
+    ------
+    A file descriptor opened for writing.
+
+    """
+    directory, basename = os.path.split(os.path.abspath(filename))
+    descriptor, tmpname = tempfile.mkstemp(
+        prefix=f".{basename}.", suffix=".part", dir=directory
+    )
+    try:
+        yield descriptor
+        # Temporary files are private, the process umask is applied here.
+        os.fchmod(descriptor, mode & ~_umask())
+        os.fsync(descriptor)
+        os.close(descriptor)
+        descriptor = None
+        os.replace(tmpname, filename)
+        _sync_directory(directory)
+    except BaseException:
+        if descriptor is not None:
+            os.close(descriptor)
+        os.unlink(tmpname)
+        raise
+
+
+@lru_cache(maxsize=None)
+def _umask():
+    """
+    Retrieve the process umask, once.
+
+    On Linux it is read from /proc. Elsewhere it can only be read by
+    setting it, which is done only on the first call.
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def _sync_directory(directory):
+    """Flush a directory entry changes to disk, where supported."""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
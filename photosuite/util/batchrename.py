@@ -0,0 +1,330 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Rename, or copy, many image files using metadata keys."""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from photosuite.util.formatter import FilenameFormatter
+from photosuite.util.imageformat import EXTENSIONS
+from photosuite.util.phexif import ExifToolPool
+
+DATE_TAGS = ["EXIF:DateTimeOriginal", "EXIF:CreateDate"]
+KEY_TAGS = {
+    "make": ["EXIF:Make"],
+    "model": ["EXIF:Model"],
+    "camera": ["EXIF:SerialNumber", "MakerNotes:SerialNumber"],
+    "lens": ["EXIF:LensSerialNumber", "MakerNotes:LensSerialNumber"],
+    "lens_model": ["EXIF:LensModel", "Composite:LensID"],
+}
+TAGS = DATE_TAGS + [tag for tags in KEY_TAGS.values() for tag in tags]
+
+
+def find_images(directory):
+    """List image files in a directory tree, ignoring hidden files."""
+    images = []
+    for folder, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            extension = os.path.splitext(name)[1].lower()
+            if not name.startswith(".") and extension in EXTENSIONS:
+                images.append(os.path.join(folder, name))
+    return images
+
+
+def capture_date(metadata, filename):
+    """Retrieve the capture date of an image, or its modification time."""
+    for tag in DATE_TAGS:
+        try:
+            return datetime.datetime.strptime(
+                str(metadata.get(tag))[:19], "%Y:%m:%d %H:%M:%S"
+            )
+        except ValueError:
+            pass
+    return datetime.datetime.fromtimestamp(os.stat(filename).st_mtime)
+
+
+def metadata_keys(metadata):
+    """Create the filename keys from the metadata of an image."""
+    keys = {}
+    for key, tags in KEY_TAGS.items():
+        values = (metadata.get(tag) for tag in tags)
+        keys[key] = str(next((v for v in values if v not in (None, "")), ""))
+    return keys
+
+
+@dataclass
+class RenamePlan:
+    """
+    The renames to be executed, the conflicts and skipped files.
+
+    Attributes
+    ----------
+    renames: list
+        The (source, target) pairs of file names.
+    conflicts: dict
+        Maps each target that cannot be used to the sources that would
+        be renamed to it.
+    skipped: list
+        Files left untouched, as ExifTool returned no metadata for them
+        (e.g. unreadable or removed files).
+
+    """
+
+    renames: list
+    conflicts: dict
+    skipped: list = field(default_factory=list)
+
+    def __len__(self):
+        """Retrieve the number of files to rename."""
+        return len(self.renames)
+
+
+class BatchRename:
+    """
+    Rename many image files using a FilenameFormatter rule.
+
+    Metadata is retrieved with batched ExifTool requests, and files are
+    named in capture order, using the capture date, and the keys
+    'camera' and 'lens' (serial numbers), 'make', 'model' and
+    'lens_model'. Every rename is planned before any file is changed,
+    so conflicts are found up front, and renames are executed in
+    parallel, recording each operation in a log that can be undone.
+    """
+
+    def __init__(self, exiftool, rename_rule, **options):
+        """
+        Initialize the object.
+
+        Parameters
+        ----------
+        exiftool: ExifToolPool
+            A running ExifTool pool used to retrieve metadata.
+        rename_rule: string
+            The FilenameFormatter rule used to name files.
+        options: variable
+            A list of optional configuration options;
+            - target: string
+                Directory where renamed files are placed. Default to
+                the directory of each file.
+            - copy: bool
+                Copy files instead of moving them, for example, when
+                ingesting from a memory card. Default to False.
+            - initial: int
+                The initial sequence number. Default to 0.
+            - batch_size: int
+                Files per ExifTool request. Default to 200.
+            - workers: int
+                Number of threads moving files. Default to 8.
+
+        """
+        self.__exiftool = exiftool
+        self.rename_rule = rename_rule
+        self.target = options.get("target")
+        self.copy = options.get("copy", False)
+        self.initial = options.get("initial", 0)
+        self.batch_size = options.get("batch_size", 200)
+        self.workers = options.get("workers", 8)
+
+    def plan(self, files):
+        """Create the plan to rename files, without changing them."""
+        files = list(files)
+        # ExifTool omits files it cannot read, results are matched by name.
+        metadata = {
+            data.get("SourceFile"): data
+            for data in self.__exiftool.iter_metadata(
+                files, TAGS, self.batch_size
+            )
+        }
+        entries = []
+        skipped = []
+        for filename in files:
+            data = metadata.get(filename)
+            if data is None:
+                skipped.append(filename)
+            else:
+                entries.append((capture_date(data, filename), filename, data))
+        entries.sort(key=lambda entry: entry[:2])
+        formatter = FilenameFormatter(self.rename_rule, initial=self.initial)
+        targets = {}
+        for date, filename, data in entries:
+            formatter.date = date
+            formatter.add_keys(metadata_keys(data))
+            directory = self.target or os.path.dirname(filename)
+            name = formatter.get_filename(filename)
+            target = os.path.join(directory, name)
+            targets.setdefault(os.path.abspath(target), []).append(filename)
+        return self.__check([entry[1] for entry in entries], targets, skipped)
+
+    def __check(self, files, targets, skipped):
+        """Find targets used by several files, or by files not renamed."""
+        sources = {os.path.abspath(filename) for filename in files}
+        renames = []
+        conflicts = {}
+        for target, names in targets.items():
+            if len(names) == 1 and os.path.abspath(names[0]) == target:
+                continue
+            # Moved files free their names, copied files do not.
+            taken = self.copy or target not in sources
+            if len(names) > 1 or (taken and os.path.lexists(target)):
+                conflicts[target] = names
+            else:
+                renames.append((names[0], target))
+        return RenamePlan(renames, conflicts, skipped)
+
+    def execute(self, plan, log=None):
+        """
+        Rename, or copy, the files of a plan.
+
+        Files which target is the current name of another file are moved
+        to a temporary name first. Every operation is appended to the
+        log, as soon as it is complete.
+
+        Parameters
+        ----------
+        plan: RenamePlan
+            The plan to execute. Must have no conflicts.
+        log: string
+            The log file name. Default to '.tether-rename-<time>.log' in
+            the current directory, where <time> is in nanoseconds.
+
+        Return
+        ------
+        The log file name.
+
+        """
+        if plan.conflicts:
+            raise Exception("Rename plan has conflicts.")
+        log = log or f".tether-rename-{time.time_ns()}.log"
+        sources = {os.path.abspath(source) for source, _ in plan.renames}
+        direct, staged = [], []
+        for source, target in plan.renames:
+            (staged if target in sources else direct).append((source, target))
+        temporary = [(source, _temporary_name(source)) for source, _ in staged]
+        with open(log, "a", encoding="utf-8") as log_file:
+            self.__run(temporary, log_file, move=True)
+            self.__run(direct, log_file, move=not self.copy)
+            self.__run(
+                [
+                    (tmp, target)
+                    for (_, tmp), (_, target) in zip(temporary, staged)
+                ],
+                log_file,
+                move=True,
+            )
+            os.fsync(log_file.fileno())
+        return log
+
+    def __run(self, operations, log_file, move):
+        """Execute operations in parallel, recording them in the log."""
+        action = "move" if move else "copy"
+        log_lock = Lock()
+
+        def run(operation):
+            source, target = operation
+            _transfer(source, target, move)
+            record = {"action": action, "source": source, "target": target}
+            with log_lock:
+                log_file.write(json.dumps(record) + "\n")
+                log_file.flush()
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            for _ in executor.map(run, operations):
+                pass
+
+
+def undo(log):
+    """Revert the operations recorded in a rename log, in reverse order."""
+    with open(log, "r", encoding="utf-8") as log_file:
+        records = [json.loads(line) for line in log_file if line.strip()]
+    for record in reversed(records):
+        if record["action"] == "copy":
+            os.unlink(record["target"])
+        else:
+            _transfer(record["target"], record["source"], True)
+
+
+def _temporary_name(filename):
+    """Create a hidden temporary name, in the same directory of a file."""
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+
+def _transfer(source, target, move):
+    """Move or copy a file, never replacing an existing file."""
+    if os.path.lexists(target):
+        raise FileExistsError(f"File exists: {target}")
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if move:
+        shutil.move(source, target)
+    else:
+        shutil.copy2(source, target)
+
+
+def main():
+    """Rename image files in a directory tree."""
+    parser = argparse.ArgumentParser(
+        description="Rename, or ingest, image files using metadata."
+    )
+    parser.add_argument("rule", nargs="?", help="The filename rule.")
+    parser.add_argument("directory", nargs="?", default=".")
+    parser.add_argument("-t", "--target", help="Target directory.")
+    parser.add_argument("-c", "--copy", action="store_true")
+    parser.add_argument("-n", "--dry-run", action="store_true")
+    parser.add_argument("-s", "--initial", type=int, default=0)
+    parser.add_argument("-l", "--log", help="Log file name.")
+    parser.add_argument("-u", "--undo", metavar="LOG")
+    args = parser.parse_args()
+    if args.undo:
+        undo(args.undo)
+        return 0
+    if args.rule is None:
+        parser.error("A filename rule is required.")
+    with ExifToolPool() as exiftool:
+        rename = BatchRename(
+            exiftool,
+            args.rule,
+            target=args.target,
+            copy=args.copy,
+            initial=args.initial,
+        )
+        plan = rename.plan(find_images(args.directory))
+    for filename in plan.skipped:
+        print(f"Skipped, no metadata: {filename}", file=sys.stderr)
+    for target, sources in plan.conflicts.items():
+        print(f"Conflict: {target} <- {', '.join(sources)}", file=sys.stderr)
+    if args.dry_run or plan.conflicts:
+        for source, target in plan.renames:
+            print(f"{source} -> {target}")
+        return 1 if plan.conflicts else 0
+    print(f"Log: {rename.execute(plan, args.log)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,6 +19,41 @@
 
 import os.path
 import datetime
+import re
+import string
+
+from photosuite.util.sequence import get_allocator
+
+FILE_KEYS = ("seq", "filename", "ext", "EXT", "original")
+DATE_FORMATS = {
+    "YYYY": "%Y",
+    "YY": "%y",
+    "MM": "%m",
+    "mon": "%b",
+    "month": "%B",
+    "DD": "%d",
+}
+CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+class _Sequence:
+    """The sequence counter, and the allocator for the directory, if any."""
+
+    def __init__(self, counter=0, directory=None):
+        """Initialize the sequence, allocating in a directory, or not."""
+        self.counter = counter
+        self.directory = directory
+        self.__allocator = None
+
+    def allocator(self, rule):
+        """Retrieve the allocator for a rule, creating it if needed."""
+        if self.__allocator is None:
+            self.__allocator = get_allocator(self.directory, rule)
+        return self.__allocator
+
+    def reset(self):
+        """Discard the allocator, when the rule or directory changes."""
+        self.__allocator = None
 
 
 class FilenameFormatter:
@@ -43,13 +78,22 @@ class FilenameFormatter:
             {camera} - camera serial number.
             {lens} - lens serial number.
             {session} - the name of the current session.
+
+    The rule is compiled once into a list of literal text and fields,
+    and the date fields are only formatted again when the date changes.
+    If no date is given, the current date is used.
+
+    If a directory is given, sequence numbers are allocated by a
+    SequenceAllocator for the directory and rule, so they continue
+    after a restart and are not shared with other processes, and
+    names already used in the directory are skipped. If the rule has
+    no sequence, or the sequence is given (e.g. 'seq=5'), a '-N' suffix
+    is added to names already used. The allocator is only created when
+    the first filename is requested.
     """
 
     def __init__(self, rename_rule="{original}", **kwargs):
         """Initialize filename formater."""
-        self.rename_rule = rename_rule
-        self.counter = kwargs.get("initial", 0)
-        self.date = kwargs.get("date", datetime.datetime.now())
         self.format_set = {
             "custom_text": kwargs.get("text", ""),
             "seq": 0,
@@ -57,18 +101,82 @@ class FilenameFormatter:
             "ext": "",
             "EXT": "",
         }
-        self.__filldate()
-
-    def __filldate(self):
-        date = {
-            "YYYY": self.date.strftime("%Y"),
-            "YY": self.date.strftime("%y"),
-            "MM": self.date.strftime("%m"),
-            "mon": self.date.strftime("%b"),
-            "month": self.date.strftime("%B"),
-            "DD": self.date.strftime("%d"),
-        }
-        self.format_set.update(date)
+        self.__sequence = _Sequence(
+            kwargs.get("initial", 0), kwargs.get("directory")
+        )
+        self.rename_rule = rename_rule
+        # The date, the day formatted, and the formatted date fields.
+        self.__dates = (kwargs.get("date"), None, {})
+
+    @property
+    def rename_rule(self):
+        """Retrieve the rule used to create filenames."""
+        return self.__rule[0]
+
+    @rename_rule.setter
+    def rename_rule(self, rule):
+        """Set and compile the rule used to create filenames."""
+        segments = []
+        fields = set()
+        for literal, field, spec, conversion in string.Formatter().parse(rule):
+            if literal:
+                segments.append(literal)
+            if field is not None:
+                segments.append(self.__compile_field(field, spec, conversion))
+                fields.add(field)
+        self.__rule = (rule, segments, fields)
+        self.__sequence.reset()
+
+    @property
+    def directory(self):
+        """Retrieve the directory where files are created."""
+        return self.__sequence.directory
+
+    @directory.setter
+    def directory(self, directory):
+        """Set the directory where files are created, or None."""
+        self.__sequence.directory = directory
+        self.__sequence.reset()
+
+    def __compile_field(self, field, spec, conversion):
+        """Create a function that formats a field of the rule."""
+        name = re.split(r"[.[]", field, maxsplit=1)[0]
+        path = None if name == field else field
+        convert = CONVERSIONS.get(conversion)
+        source = 0 if name in FILE_KEYS else 1 if name in DATE_FORMATS else 2
+        user_keys = self.format_set
+
+        def format_field(files, dates):
+            value = (files, dates, user_keys)[source][name]
+            if path is not None:
+                value = string.Formatter().get_field(path, (), {name: value})[0]
+            if convert is not None:
+                value = convert(value)
+            return format(value, spec)
+
+        return format_field
+
+    @property
+    def date(self):
+        """Retrieve the date used in filenames."""
+        return self.__dates[0] or datetime.datetime.now()
+
+    @date.setter
+    def date(self, value):
+        """Set the date used in filenames, or None to use current date."""
+        # Date fields are formatted again only if the day changes.
+        self.__dates = (value, *self.__dates[1:])
+
+    def __current_dates(self):
+        """Retrieve the date fields, formatting them if the date changed."""
+        date, formatted, fields = self.__dates
+        day = date.date() if date else datetime.date.today()
+        if day != formatted:
+            fields = {
+                key: day.strftime(fmt) for key, fmt in DATE_FORMATS.items()
+            }
+            self.__dates = (date, day, fields)
+        return fields
 
     def set(self, key, value):
         """Add or modify an existing filename formatter key."""
@@ -80,19 +188,91 @@ class FilenameFormatter:
         """Add several key-value pairs to the filename formatter."""
         self.format_set.update(keys)
 
+    def __render(self, original, counter, dates, overrides):
+        """Create a filename from the compiled rule."""
+        fname, ext = os.path.splitext(original)
+        files = {
+            "seq": counter,
+            "filename": os.path.basename(fname),
+            "ext": ext[1:].lower(),
+            "EXT": ext[1:].upper(),
+            "original": os.path.basename(original),
+        }
+        if overrides:
+            files.update(overrides)
+        return "".join(
+            segment if isinstance(segment, str) else segment(files, dates)
+            for segment in self.__rule[1]
+        )
+
     def get_filename(self, original, **kwargs):
         """Format the filename given the current rules."""
-        self.counter += 1
-        self.set("seq", self.counter)
-        self.__filldate()
-        (fname, ext) = os.path.splitext(original)
-        self.set("ext", ext[1:].lower())
-        self.set("EXT", ext[1:].upper())
-        self.set("filename", os.path.basename(fname))
-        self.set("original", os.path.basename(original))
+        return self.get_filenames([original], **kwargs)[0]
+
+    def get_filenames(self, originals, **kwargs):
+        """
+        Format the filenames of several files, in order.
+
+        Parameters
+        ----------
+        originals: list
+            The original file names.
+        kwargs: variable
+            Keys added to the formatter before creating the filenames.
+
+        Return
+        ------
+        A list with the new filename of each original file.
+
+        """
         for key, value in kwargs.items():
             self.set(key, value)
-        return self.rename_rule.format(**self.format_set)
+        dates = self.__current_dates()
+        overrides = {}
+        if kwargs:
+            dates = {**dates, **kwargs}
+            overrides = {k: v for k, v in kwargs.items() if k in FILE_KEYS}
+        sequence = self.__sequence
+        if sequence.directory is not None:
+            return self.__allocate(originals, dates, overrides)
+        filenames = []
+        for original in originals:
+            sequence.counter += 1
+            filenames.append(
+                self.__render(original, sequence.counter, dates, overrides)
+            )
+        return filenames
+
+    def __allocate(self, originals, dates, overrides):
+        """Create filenames not used in the directory."""
+        rule, _segments, fields = self.__rule
+        sequence = self.__sequence
+        allocator = sequence.allocator(rule)
+        # Names with no sequence, or a fixed one, get a suffix if taken.
+        if "seq" not in fields or "seq" in overrides:
+            filenames = []
+            for original in originals:
+                sequence.counter += 1
+                filename = self.__render(
+                    original, sequence.counter, dates, overrides
+                )
+                filenames.append(allocator.claim_unique(filename))
+            return filenames
+        first = allocator.reserve(len(originals))
+        filenames = []
+        for offset, original in enumerate(originals):
+            sequence.counter = first + offset
+            filename = self.__render(
+                original, sequence.counter, dates, overrides
+            )
+            # Names taken by files not following the sequence are skipped.
+            while not allocator.claim(filename):
+                sequence.counter = allocator.reserve()
+                filename = self.__render(
+                    original, sequence.counter, dates, overrides
+                )
+            filenames.append(filename)
+        return filenames
 
     @property
     def filename(self):
@@ -102,12 +282,12 @@ class FilenameFormatter:
     @property
     def counter(self):
         """Retrieve current sequence counter."""
-        return self._counter
+        return self.__sequence.counter
 
     @counter.setter
     def counter(self, value):
         """Set sequence counter."""
-        self._counter = value
+        self.__sequence.counter = value
 
     @property
     def keys(self):
@@ -0,0 +1,164 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Detect image file formats from their first bytes."""
+
+import os
+import threading
+from enum import Enum
+
+
+class ImageFormat(Enum):
+    """Image file formats, with their MIME type and if they are RAW."""
+
+    UNKNOWN = ("application/octet-stream", False)
+    JPEG = ("image/jpeg", False)
+    TIFF = ("image/tiff", False)
+    PNG = ("image/png", False)
+    GIF = ("image/gif", False)
+    CR2 = ("image/x-canon-cr2", True)
+    CR3 = ("image/x-canon-cr3", True)
+    NEF = ("image/x-nikon-nef", True)
+    ARW = ("image/x-sony-arw", True)
+    ORF = ("image/x-olympus-orf", True)
+    RAF = ("image/x-fuji-raf", True)
+    DNG = ("image/x-adobe-dng", True)
+    RW2 = ("image/x-panasonic-rw2", True)
+    # Other image formats, only recognized by libmagic.
+    IMAGE = ("image/*", False)
+
+    def __init__(self, mime_type, raw):
+        """Initialize the format attributes."""
+        self.mime_type = mime_type
+        self.is_raw = raw
+
+    @property
+    def is_image(self):
+        """Tell if the format is an image format."""
+        return self is not ImageFormat.UNKNOWN
+
+
+HEADER_SIZE = 512
+
+EXTENSIONS = {
+    ".jpg": ImageFormat.JPEG,
+    ".jpeg": ImageFormat.JPEG,
+    ".tif": ImageFormat.TIFF,
+    ".tiff": ImageFormat.TIFF,
+    ".png": ImageFormat.PNG,
+    ".gif": ImageFormat.GIF,
+    ".cr2": ImageFormat.CR2,
+    ".cr3": ImageFormat.CR3,
+    ".nef": ImageFormat.NEF,
+    ".arw": ImageFormat.ARW,
+    ".orf": ImageFormat.ORF,
+    ".raf": ImageFormat.RAF,
+    ".dng": ImageFormat.DNG,
+    ".rw2": ImageFormat.RW2,
+}
+
+# Formats that share the TIFF signature, and can only be told apart by
+# the file extension.
+TIFF_BASED = (
+    ImageFormat.TIFF,
+    ImageFormat.NEF,
+    ImageFormat.ARW,
+    ImageFormat.DNG,
+)
+
+# Format signatures, as the bytes found at each offset, checked in order,
+# so formats based on TIFF are checked before TIFF itself.
+SIGNATURES = (
+    (((0, b"\xff\xd8\xff"),), ImageFormat.JPEG),
+    (((0, b"\x89PNG\r\n\x1a\n"),), ImageFormat.PNG),
+    (((0, b"GIF87a"),), ImageFormat.GIF),
+    (((0, b"GIF89a"),), ImageFormat.GIF),
+    (((0, b"FUJIFILMCCD-RAW"),), ImageFormat.RAF),
+    (((4, b"ftypcrx "),), ImageFormat.CR3),
+    (((0, b"IIRO"),), ImageFormat.ORF),
+    (((0, b"IIRS"),), ImageFormat.ORF),
+    (((0, b"MMOR"),), ImageFormat.ORF),
+    (((0, b"IIU\0"),), ImageFormat.RW2),
+    (((0, b"II*\0"), (8, b"CR")), ImageFormat.CR2),
+    (((0, b"MM\0*"), (8, b"CR")), ImageFormat.CR2),
+    (((0, b"II*\0"),), ImageFormat.TIFF),
+    (((0, b"MM\0*"),), ImageFormat.TIFF),
+)
+
+MIME_TYPES = {fmt.mime_type: fmt for fmt in ImageFormat}
+
+_MAGIC = threading.local()
+
+
+def detect(filename):
+    """
+    Detect the format of an image file.
+
+    Only the first bytes of the file are read, and checked against the
+    signature of the format given by the file extension, and then of
+    every known format. Files not recognized are checked with libmagic,
+    if available.
+
+    Parameters
+    ----------
+    filename: string
+        The name of the file to check.
+
+    Return
+    ------
+    The ImageFormat of the file.
+
+    """
+    with open(filename, "rb") as file:
+        header = file.read(HEADER_SIZE)
+    _, extension = os.path.splitext(filename)
+    expected = EXTENSIONS.get(extension.lower())
+    found = from_header(header)
+    if found is ImageFormat.TIFF and expected in TIFF_BASED:
+        return expected
+    if found is ImageFormat.UNKNOWN:
+        return _from_libmagic(filename)
+    return found
+
+
+def from_header(header):
+    """Detect an image format from the first bytes of a file."""
+    for signature, image_format in SIGNATURES:
+        if all(
+            header[offset : offset + len(magic)] == magic
+            for offset, magic in signature
+        ):
+            return image_format
+    return ImageFormat.UNKNOWN
+
+
+def _from_libmagic(filename):
+    """Detect a file format using libmagic, if it is available."""
+    mime = getattr(_MAGIC, "mime", None)
+    if mime is None:
+        try:
+            from magic import Magic  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            return ImageFormat.UNKNOWN
+        # Magic objects are not thread-safe, use one for each thread.
+        mime = _MAGIC.mime = Magic(True)
+    mime_type = mime.from_file(filename)  # pylint: disable=no-member
+    if mime_type in MIME_TYPES:
+        return MIME_TYPES[mime_type]
+    if mime_type.startswith("image/"):
+        return ImageFormat.IMAGE
+    return ImageFormat.UNKNOWN
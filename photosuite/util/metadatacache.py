@@ -0,0 +1,198 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Cache image metadata extracted with ExifTool."""
+
+import os
+import json
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+
+
+def default_database():
+    """Retrieve the path of the default on-disk metadata store."""
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache, "tether", "metadata.sqlite")
+
+
+class MetadataCache:
+    """
+    Cache metadata in front of an ExifTool object.
+
+    Entries are keyed by the file real path, size and modification
+    time, so a modified file is read again. The most recently used
+    entries are kept in memory, and, optionally, all entries are stored
+    in a SQLite database, so they survive across sessions.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metadata (
+            path TEXT, size INTEGER, mtime INTEGER, tags TEXT, data TEXT,
+            PRIMARY KEY (path, size, mtime, tags)
+        )
+    """
+
+    def __init__(self, exiftool, **options):
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        exiftool: ExifTool or ExifToolPool
+            The object used to retrieve metadata not in the cache.
+        options: variable
+            A list of optional configuration options;
+            - max_entries: int
+                Maximum number of entries kept in memory.
+                Default to 1024.
+            - max_bytes: int
+                Maximum size of entries kept in memory, measured as the
+                size of their JSON representation. Default to 64 MiB.
+            - database: string
+                Path of a SQLite database used to store entries on disk.
+                Default to no on-disk storage.
+
+        """
+        self.__exiftool = exiftool
+        self.max_entries = options.get("max_entries", 1024)
+        self.max_bytes = options.get("max_bytes", 64 << 20)
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__lock = Lock()
+        self.__db = None
+        database = options.get("database")
+        if database is not None:
+            os.makedirs(os.path.dirname(database) or ".", exist_ok=True)
+            self.__db = sqlite3.connect(database, check_same_thread=False)
+            self.__db.execute(MetadataCache.SCHEMA)
+
+    def __len__(self):
+        """Query the number of entries in memory."""
+        return len(self.__entries)
+
+    @property
+    def size(self):
+        """Query the size of entries in memory, in bytes."""
+        return self.__size
+
+    def get_metadata(self, *files, tags=None):
+        """
+        Retrieve metadata, in the same format as ExifTool.get_metadata.
+
+        Metadata not cached is retrieved for all files with a single
+        ExifTool request. Files ExifTool cannot read are not reported.
+        """
+        keys = [self.__key(filename, tags) for filename in files]
+        found = {}
+        missing = []
+        for filename, key in zip(files, keys):
+            entry = None if key is None else self.__lookup(key)
+            if entry is None:
+                missing.append(filename)
+            else:
+                found[filename] = entry
+        if missing:
+            found.update(self.__extract(missing, keys, files, tags))
+        return [found[filename] for filename in files if filename in found]
+
+    def invalidate(self, filename=None):
+        """Discard entries for a file, or every entry."""
+        with self.__lock:
+            path = None if filename is None else os.path.realpath(filename)
+            for key in list(self.__entries):
+                if path is None or key[0] == path:
+                    self.__size -= self.__entries.pop(key)[1]
+            if self.__db is not None:
+                condition = "" if path is None else " WHERE path = ?"
+                params = () if path is None else (path,)
+                self.__db.execute(f"DELETE FROM metadata{condition}", params)
+                self.__db.commit()
+
+    def close(self):
+        """Close the on-disk storage."""
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+    @staticmethod
+    def __key(filename, tags):
+        """Create the cache key for a file, or None if it does not exist."""
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        tags = ",".join(tags or [])
+        return os.path.realpath(filename), stat.st_size, stat.st_mtime_ns, tags
+
+    def __lookup(self, key):
+        """Find an entry in memory or on disk."""
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                return self.__entries[key][0]
+            if self.__db is None:
+                return None
+            row = self.__db.execute(
+                "SELECT data FROM metadata WHERE path = ? AND size = ?"
+                " AND mtime = ? AND tags = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        entry = json.loads(row[0])
+        self.__store(key, entry, row[0], persist=False)
+        return entry
+
+    def __extract(self, missing, keys, files, tags):
+        """Retrieve metadata with ExifTool, and cache it."""
+        result = self.__exiftool.get_metadata(*missing, tags=tags)
+        if isinstance(result, Future):
+            result = result.result()
+        by_source = {entry.get("SourceFile"): entry for entry in result}
+        key_for = dict(zip(files, keys))
+        extracted = {}
+        for filename in missing:
+            entry = by_source.get(filename)
+            if entry is not None:
+                extracted[filename] = entry
+                if key_for[filename] is not None:
+                    self.__store(key_for[filename], entry, json.dumps(entry))
+        if self.__db is not None:
+            with self.__lock:
+                self.__db.commit()
+        return extracted
+
+    def __store(self, key, entry, data, persist=True):
+        """Add an entry to the cache, evicting least recently used ones."""
+        with self.__lock:
+            if key in self.__entries:
+                self.__size -= self.__entries.pop(key)[1]
+            self.__entries[key] = (entry, len(data))
+            self.__size += len(data)
+            while len(self.__entries) > 1 and (
+                len(self.__entries) > self.max_entries
+                or self.__size > self.max_bytes
+            ):
+                self.__size -= self.__entries.popitem(last=False)[1][1]
+            if persist and self.__db is not None:
+                self.__db.execute(
+                    "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)",
+                    (*key, data),
+                )
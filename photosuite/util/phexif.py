@@ -17,9 +17,99 @@
 
 """Controls Phil Harvey's ExifTool through a pipe to extract metadata."""
 
+import io
 import os
+import re
 import json
+import base64
+import asyncio
+import itertools
+from concurrent.futures import Future
 from subprocess import Popen, PIPE
+from threading import Lock, Thread
+
+from photosuite.util.rawpreview import embedded_jpeg
+
+
+class ResponseTooLarge(Exception):
+    """Raised when an ExifTool response exceeds the maximum size."""
+
+    def __init__(self, max_size, sequence=None):
+        """Initialize exception object."""
+        super().__init__(f"ExifTool response larger than {max_size} bytes.")
+        self.sequence = sequence
+
+
+class ResponseReader:  # pylint: disable=too-few-public-methods
+    """
+    Split ExifTool output into responses.
+
+    Data is read into a preallocated buffer and appended to a growable
+    one, and only the data not yet searched, plus enough bytes to hold
+    a mark split between reads, is searched for the '{ready}' marks.
+    """
+
+    MARK = re.compile(rb"{ready(\d*)}\r?\n")
+    MARK_SIZE = 32
+
+    def __init__(self, descriptor, max_size=None, chunk_size=65536):
+        """
+        Initialize the reader.
+
+        Parameters
+        ----------
+        descriptor: int
+            The file descriptor of ExifTool standard output.
+        max_size: int
+            Maximum size of a response, in bytes. Larger responses are
+            discarded. Default to no limit.
+        chunk_size: int
+            Maximum number of bytes read at once.
+
+        """
+        self.__stream = io.FileIO(descriptor, closefd=False)
+        self.__chunk = memoryview(bytearray(chunk_size))
+        self.__output = bytearray()
+        self.__scan = 0
+        self.__discard = False
+        self.max_size = max_size
+
+    def read(self):
+        """
+        Read the next response.
+
+        Returns a (sequence, response) pair, where sequence is the number
+        used with '-execute', or None if no number was used. If ExifTool
+        terminates, None is returned.
+        """
+        while True:
+            match = ResponseReader.MARK.search(self.__output, self.__scan)
+            if match is not None:
+                return self.__take(match)
+            self.__scan = max(0, len(self.__output) - ResponseReader.MARK_SIZE)
+            if self.max_size and len(self.__output) > self.max_size:
+                # Keep only what is needed to find the end of response.
+                del self.__output[: self.__scan]
+                self.__scan = 0
+                self.__discard = True
+            count = self.__stream.readinto(self.__chunk)
+            if not count:
+                return None
+            self.__output += self.__chunk[:count]
+
+    def __take(self, match):
+        """Remove a response from the output buffer."""
+        sequence = int(match.group(1)) if match.group(1) else None
+        too_large = self.__discard or (
+            self.max_size and match.start() > self.max_size
+        )
+        response = b"" if too_large else bytes(self.__output[: match.start()])
+        del self.__output[: match.end()]
+        self.__scan = 0
+        self.__discard = False
+        if too_large:
+            raise ResponseTooLarge(self.max_size, sequence)
+        return sequence, response.strip()
 
 
 class ExifTool:
@@ -37,19 +127,31 @@ class ExifTool:
         "-b",
     ]
     STOP = ["-stay_open", "False"]
+    PREVIEW_TAGS = ["JpgFromRaw", "PreviewImage", "OtherImage"]
+
+    def __init__(self, max_response_size=None):
+        """
+        Initialize the object, without starting ExifTool.
 
-    def __init__(self):
-        """Start running ExifTool in the background."""
+        Parameters
+        ----------
+        max_response_size: int
+            Maximum size of a response, in bytes. Requests with larger
+            responses fail with ResponseTooLarge. Default to no limit.
+
+        """
         self._running = False
         self._process = None
+        self._reader = None
+        self.max_response_size = max_response_size
 
     def start(self):
         """Initialize the Exiftool application."""
-        with open(os.devnull, "w") as devnull:
-            self._process = Popen(  # pylint: disable=consider-using-with
-                ExifTool.COMMAND, stdin=PIPE, stdout=PIPE, stderr=devnull
-            )
-            self._running = True
+        self._process = _start_process()
+        self._reader = ResponseReader(
+            self._process.stdout.fileno(), self.max_response_size
+        )
+        self._running = True
 
     def terminate(self):
         """Terminate the running process if it is still running."""
@@ -59,42 +161,119 @@ class ExifTool:
             del self._process
             self._running = False
 
-    def _read_response(self, mark):
+    def _read_response(self):
         if not self._running:
             raise Exception("This should only be called from inside ExifTool.")
-        output = b""
-        data = b""
-        lsz = -len(mark)
-        stdout_fd = self._process.stdout.fileno()
-        while not data[2 * lsz :].strip().endswith(mark):
-            data = os.read(stdout_fd, 4096)
-            output += data
-        return output.strip()[:lsz]
+        response = self._reader.read()
+        if response is None:
+            raise Exception("ExifTool process terminated.")
+        return response[1]
 
     def _execute(self, *files):
         if not self._running:
             raise Exception("ExifTool must be running. Use 'start()' before.")
         params = [*files, "-execute"]
         self._send_cmd(params)
-        return self._read_response(b"{ready}")
+        return self._read_response()
+
+    def get_metadata(self, *files, tags=None):
+        """
+        Retrieve metadata in JSON format.
+
+        Parameters
+        ----------
+        files: variable
+            The files to retrieve metadata from.
+        tags: list of strings
+            Retrieve only these tags (e.g. 'EXIF:Orientation', 'Model').
+            Default to all tags.
+
+        """
+        if not self._running:
+            raise Exception("ExifTool must be running. Use 'start()' before.")
+        params = _metadata_params(files, tags)
+        return _decode_metadata(self._execute(*params))
+
+    def iter_metadata(self, files, tags=None, batch_size=100):
+        """
+        Retrieve metadata for many files, in batches.
+
+        Files are sent to ExifTool 'batch_size' at a time, and the next
+        batch is sent before the current one is parsed, so ExifTool is
+        kept busy. If iteration stops early, or fails, the response of
+        the batch already sent is discarded.
 
-    def get_metadata(self, *files):
-        """Retrieve metadata in JSON format."""
+        Parameters
+        ----------
+        files: iterable
+            The files to retrieve metadata from.
+        tags: list of strings
+            Retrieve only these tags. Default to all tags.
+        batch_size: int
+            Maximum number of files per ExifTool request.
+
+        Yield
+        -----
+        The metadata of each file, in the order they are processed.
+
+        """
         if not self._running:
             raise Exception("ExifTool must be running. Use 'start()' before.")
-        return json.loads(self._execute("-j", *files).decode("utf-8"))
+        batches = _batches(files, batch_size)
+        outstanding = 0
+        try:
+            batch = next(batches, None)
+            if batch is not None:
+                self._send_cmd([*_metadata_params(batch, tags), "-execute"])
+                outstanding += 1
+            while batch is not None:
+                batch = next(batches, None)
+                if batch is not None:
+                    self._send_cmd([*_metadata_params(batch, tags), "-execute"])
+                    outstanding += 1
+                outstanding -= 1
+                yield from _decode_metadata(self._read_response())
+        finally:
+            self.__discard_responses(outstanding)
+
+    def __discard_responses(self, count):
+        """Read and discard responses to requests already sent."""
+        for _ in range(count):
+            try:
+                if self._reader.read() is None:
+                    break
+            except ResponseTooLarge:
+                pass
+
+    def get_image_preview(self, filename):
+        """
+        Retrieve the largest JPEG image embedded in a file.
+
+        TIFF based RAW files, and Fujifilm RAF files, are parsed directly,
+        and ExifTool is used only for other formats.
+
+        Parameters
+        ----------
+        filename: string
+            The image file.
 
-    def get_image_preview(self, *files):
-        """Retrieve preview images in base64."""
-        return self._execute("-PreviewImage", *files)
+        Return
+        ------
+        A bytes-like object with the JPEG data, empty if no preview was
+        found.
+
+        """
+        preview = embedded_jpeg(filename)
+        if preview is not None:
+            return preview
+        return _largest_preview(
+            self.get_metadata(filename, tags=ExifTool.PREVIEW_TAGS)
+        )
 
     def _send_cmd(self, *args):
         """Send a command to the running process."""
         if self._running:
-            params = [i for subl in args for i in subl]
-            data = "%s\n" % "\n".join(params)
-            self._process.stdin.write(bytes(data.encode("utf-8")))
-            self._process.stdin.flush()
+            _write_command(self._process, *args)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Terminate program when object does not exist anymore."""
@@ -108,3 +287,258 @@ class ExifTool:
         """Start context."""
         self.start()
         return self
+
+
+def _start_process():
+    """Start an ExifTool process that reads commands from its input."""
+    with open(os.devnull, "w") as devnull:
+        return Popen(  # pylint: disable=consider-using-with
+            ExifTool.COMMAND, stdin=PIPE, stdout=PIPE, stderr=devnull
+        )
+
+
+def _write_command(process, *args):
+    """Send a command to an ExifTool process."""
+    params = [i for subl in args for i in subl]
+    data = "%s\n" % "\n".join(params)
+    process.stdin.write(bytes(data.encode("utf-8")))
+    process.stdin.flush()
+
+
+def _metadata_params(files, tags=None):
+    """Create the ExifTool parameters to retrieve metadata as JSON."""
+    return ["-j", *[f"-{tag}" for tag in tags or []], *files]
+
+
+def _decode_metadata(response):
+    """
+    Decode a JSON metadata response.
+
+    ExifTool writes nothing when it cannot read any of the files, so an
+    empty response has no metadata.
+    """
+    return json.loads(response.decode("utf-8")) if response else []
+
+
+def _batches(items, size):
+    """Split an iterable in lists of, at most, 'size' items."""
+    items = iter(items)
+    batch = list(itertools.islice(items, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(items, size))
+
+
+def _largest_preview(metadata):
+    """Select the largest binary image from JSON metadata."""
+    previews = [
+        base64.b64decode(value[len("base64:") :])
+        for value in (metadata[0] if metadata else {}).values()
+        if isinstance(value, str) and value.startswith("base64:")
+    ]
+    return max(previews, key=len, default=b"")
+
+
+def _transform_future(future, transform):
+    """Create a Future with the result of 'transform(future.result())'."""
+    result = Future()
+
+    def done(source):
+        try:
+            result.set_result(transform(source.result()))
+        except Exception as ex:  # pylint: disable=broad-except
+            result.set_exception(ex)
+
+    future.add_done_callback(done)
+    return result
+
+
+class PipelinedExifTool:
+    """
+    An ExifTool process that accepts several requests at once.
+
+    Each request is sent with a numbered '-execute' command, so its
+    response is terminated by a matching '{ready<N>}' mark. A reader
+    thread collects responses and completes the request futures, and
+    it is the only thread reading ExifTool output, so every request
+    must go through 'submit'.
+    """
+
+    def __init__(self, max_response_size=None):
+        """Initialize the object, without starting ExifTool."""
+        self.max_response_size = max_response_size
+        self.__lock = Lock()
+        self.__pending = {}
+        self.__sequence = itertools.count(1)
+        self.__process = None
+        self.__reader = None
+        self.__running = False
+
+    @property
+    def in_flight(self):
+        """Query the number of requests waiting for a response."""
+        return len(self.__pending)
+
+    def start(self):
+        """Initialize the Exiftool application and the response reader."""
+        self.__process = _start_process()
+        reader = ResponseReader(
+            self.__process.stdout.fileno(), self.max_response_size
+        )
+        self.__running = True
+        self.__reader = Thread(
+            target=self.__read_responses, args=(reader,), daemon=True
+        )
+        self.__reader.start()
+
+    def terminate(self):
+        """Terminate the running process, after pending requests finish."""
+        if self.__reader is None:
+            return
+        with self.__lock:
+            if self.__running:
+                _write_command(self.__process, ExifTool.STOP)
+                self.__running = False
+            self.__process.stdin.close()
+        self.__reader.join()
+        self.__process.wait()
+        self.__reader = None
+
+    def submit(self, *params):
+        """Send a request, returning a Future for its raw response."""
+        future = Future()
+        with self.__lock:
+            if not self.__running:
+                raise Exception("ExifTool is not running.")
+            sequence = next(self.__sequence)
+            self.__pending[sequence] = future
+            try:
+                _write_command(self.__process, [*params, f"-execute{sequence}"])
+            except OSError:
+                del self.__pending[sequence]
+                raise Exception("ExifTool process terminated.") from None
+        return future
+
+    def get_metadata(self, *files, tags=None):
+        """Retrieve metadata, returning a Future for the decoded JSON."""
+        return _transform_future(
+            self.submit(*_metadata_params(files, tags)), _decode_metadata
+        )
+
+    def __read_responses(self, reader):
+        """Complete pending requests as their responses arrive."""
+        while True:
+            try:
+                response = reader.read()
+            except ResponseTooLarge as ex:
+                future = self.__pending.pop(ex.sequence, None)
+                if future is not None:
+                    future.set_exception(ex)
+                continue
+            if response is None:
+                break
+            future = self.__pending.pop(response[0], None)
+            if future is not None:
+                future.set_result(response[1])
+        # ExifTool exited, new requests fail, and pending ones never end.
+        with self.__lock:
+            self.__running = False
+            pending = list(self.__pending.values())
+            self.__pending.clear()
+        for future in pending:
+            future.set_exception(Exception("ExifTool process terminated."))
+
+    def __enter__(self):
+        """Start context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Terminate the ExifTool process."""
+        self.terminate()
+
+
+class ExifToolPool:
+    """Distribute metadata requests among several ExifTool processes."""
+
+    def __init__(self, size=None, max_response_size=None):
+        """
+        Initialize the pool, without starting ExifTool.
+
+        Parameters
+        ----------
+        size: int
+            The number of ExifTool processes. Default to the number of
+            CPUs available.
+        max_response_size: int
+            Maximum size of a response, in bytes. Default to no limit.
+
+        """
+        self.__workers = [
+            PipelinedExifTool(max_response_size)
+            for _ in range(size or os.cpu_count() or 1)
+        ]
+        self.__lock = Lock()
+
+    @property
+    def size(self):
+        """Query the number of ExifTool processes."""
+        return len(self.__workers)
+
+    def start(self):
+        """Start every ExifTool process."""
+        for worker in self.__workers:
+            worker.start()
+
+    def terminate(self):
+        """Terminate every ExifTool process."""
+        for worker in self.__workers:
+            worker.terminate()
+
+    def submit(self, *params):
+        """Send a request to the least busy ExifTool process."""
+        with self.__lock:
+            worker = min(self.__workers, key=lambda w: w.in_flight)
+            return worker.submit(*params)
+
+    def get_metadata(self, *files, tags=None):
+        """Retrieve metadata, returning a Future for the decoded JSON."""
+        with self.__lock:
+            worker = min(self.__workers, key=lambda w: w.in_flight)
+            return worker.get_metadata(*files, tags=tags)
+
+    async def get_metadata_async(self, *files, tags=None):
+        """Retrieve metadata, to be awaited in an asyncio event loop."""
+        return await asyncio.wrap_future(self.get_metadata(*files, tags=tags))
+
+    def get_image_preview(self, filename):
+        """Retrieve the largest JPEG image embedded in a file."""
+        preview = embedded_jpeg(filename)
+        if preview is not None:
+            return preview
+        return _largest_preview(
+            self.get_metadata(filename, tags=ExifTool.PREVIEW_TAGS).result()
+        )
+
+    def iter_metadata(self, files, tags=None, batch_size=100):
+        """
+        Retrieve metadata for many files, in batches, in parallel.
+
+        Every batch is submitted at once, and results are produced in
+        the order of 'files', as soon as each batch is complete.
+        """
+        requests = [
+            self.get_metadata(*batch, tags=tags)
+            for batch in _batches(files, batch_size)
+        ]
+        for request in requests:
+            yield from request.result()
+
+    def __enter__(self):
+        """Start context."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Terminate every ExifTool process."""
+        self.terminate()
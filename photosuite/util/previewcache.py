@@ -0,0 +1,320 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Keep reduced versions of images on disk."""
+
+import os
+import json
+import time
+import hashlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from photosuite.util.atomicfile import atomic_write
+
+
+def default_directory():
+    """Retrieve the path of the default preview cache directory."""
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache, "tether", "previews")
+
+
+@lru_cache(maxsize=4096)
+def _content_key(signature):
+    """Hash the size and content of a file, once for each signature."""
+    path, size, _mtime = signature
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    chunk = memoryview(bytearray(PreviewCache.CHUNK_SIZE))
+    with open(path, "rb", buffering=0) as file:
+        count = file.readinto(chunk)
+        while count:
+            digest.update(chunk[:count])
+            count = file.readinto(chunk)
+    return digest.hexdigest()
+
+
+def _scan(directory):
+    """Find the last use and the size of every entry in a directory."""
+    entries = {}
+    for folder, _dirs, files in os.walk(directory):
+        for name in files:
+            if name.startswith("."):
+                continue
+            key = name.split(".")[0].split("_")[0]
+            try:
+                stat = os.stat(os.path.join(folder, name))
+            except FileNotFoundError:
+                continue
+            used, size = entries.get(key, (0, 0))
+            if name.endswith(".json"):
+                used = stat.st_mtime
+            entries[key] = [used, size + stat.st_size]
+    return entries
+
+
+class _Usage:
+    """
+    Keep the last use and the size of the entries of a cache.
+
+    The directory is scanned once, when entries are first added, and
+    the total size is kept up to date afterwards, so finding the
+    entries to remove does not walk the directory again.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """Initialize the usage of the cache in a directory."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.__entries = None
+        self.__total = 0
+
+    def used(self, key):
+        """Mark an entry as recently used."""
+        if self.__entries is not None and key in self.__entries:
+            self.__entries[key][0] = time.time()
+
+    def added(self, key, size):
+        """
+        Account for a new entry, already saved in the directory.
+
+        Returns the keys of the least recently used entries that must be
+        removed to keep the cache within its maximum size.
+        """
+        if self.__entries is None:
+            self.__entries = _scan(self.directory)
+            self.__total = sum(n for _, n in self.__entries.values())
+        else:
+            _, previous = self.__entries.get(key, (0, 0))
+            self.__entries[key] = [time.time(), size]
+            self.__total += size - previous
+        removed = []
+        if self.__total > self.max_bytes:
+            entries = self.__entries.items()
+            for _, old in sorted((used, old) for old, (used, _) in entries):
+                if self.__total <= self.max_bytes or old == key:
+                    break
+                self.__total -= self.__entries.pop(old)[1]
+                removed.append(old)
+        return removed
+
+
+class PreviewCache:
+    """
+    Store a pyramid of reduced versions of each image, on disk.
+
+    Entries are addressed by a hash of the file size and content, so
+    the same image is found even if it is renamed or copied. The hash
+    of each file is computed once for each path, size and modification
+    time.
+
+    Each entry holds JPEG versions of the image with the longest side
+    limited to each of the configured sizes, and a small index with
+    the size of the original image. When the cache grows beyond
+    its maximum size, the least recently used entries are removed.
+    """
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, loader, directory=None, **options):
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        loader: Callable
+            Called with a file name, must return a PIL Image with its
+            contents (e.g. the embedded preview for RAW files).
+        directory: string
+            The cache directory. Default to 'tether/previews' in the
+            user cache directory.
+        options: variable
+            A list of optional configuration options;
+            - sizes: list of int
+                Maximum length of the longest side of each version.
+                Default to (256, 1024), add the screen size to have a
+                version that fills the screen.
+            - max_bytes: int
+                Maximum size of the cache. Default to 1 GiB.
+            - workers: int
+                Number of threads building entries in background.
+                Default to 1.
+
+        """
+        self.__loader = loader
+        self.directory = directory or default_directory()
+        self.sizes = sorted(options.get("sizes", (256, 1024)))
+        self.__executor = ThreadPoolExecutor(options.get("workers", 1))
+        self.__lock = Lock()
+        self.__building = {}
+        self.__usage = _Usage(self.directory, options.get("max_bytes", 1 << 30))
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def max_bytes(self):
+        """Retrieve the maximum size of the cache, in bytes."""
+        return self.__usage.max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        """Set the maximum size of the cache, in bytes."""
+        self.__usage.max_bytes = value
+
+    @staticmethod
+    def content_key(filename):
+        """Compute the key of a file, from its size and content."""
+        stat = os.stat(filename)
+        return _content_key(
+            (os.path.realpath(filename), stat.st_size, stat.st_mtime_ns)
+        )
+
+    def get(self, filename, size, build=False):
+        """
+        Find a version of an image large enough for 'size'.
+
+        Parameters
+        ----------
+        filename: string
+            The original image file name.
+        size: tuple
+            The (width, height) the image will be displayed at.
+        build: bool
+            Build the entry, if it does not exist.
+
+        Return
+        ------
+        A (path, source_size) pair, with the path of the smallest version
+        that covers 'size' and the size of the original image, or None
+        if there is no such version.
+
+        """
+        key = self.content_key(filename)
+        index = self.__read_index(key)
+        if index is None and build:
+            index = self.build(filename)
+        if index is None:
+            return None
+        source_size = tuple(index["source_size"])
+        needed = min(max(size), max(source_size))
+        for level in index["levels"]:
+            if level >= needed:
+                return self.__path(key, level), source_size
+        return None
+
+    def schedule(self, filename, image=None, source_size=None):
+        """Build the entry for an image in background, see 'build'."""
+        return self.__executor.submit(self.build, filename, image, source_size)
+
+    def shutdown(self):
+        """Wait for entries being built."""
+        self.__executor.shutdown()
+
+    def build(self, filename, image=None, source_size=None):
+        """
+        Build the entry for an image, if it does not exist.
+
+        Parameters
+        ----------
+        filename: string
+            The original image file name.
+        image: PIL.Image
+            The image already decoded, at least as large as the largest
+            version, or its original size. It is modified. If not
+            given, the image is loaded from the file.
+        source_size: tuple
+            The size of the original image, if 'image' was reduced.
+
+        """
+        key = self.content_key(filename)
+        with self.__lock:
+            if key in self.__building:
+                request = self.__building[key]
+            else:
+                request = self.__building[key] = Lock()
+        with request:
+            index = self.__read_index(key)
+            if index is None:
+                index = self.__build(key, filename, image, source_size)
+        with self.__lock:
+            self.__building.pop(key, None)
+        return index
+
+    def __build(self, key, filename, image, source_size):
+        """Create every version of an image, from the largest one."""
+        if image is None:
+            image = self.__loader(filename)
+            source_size = image.size
+            image.draft("RGB", (self.sizes[-1], self.sizes[-1]))
+        source_size = source_size or image.size
+        os.makedirs(os.path.dirname(self.__path(key)), exist_ok=True)
+        levels = []
+        written = 0
+        for level in reversed(self.sizes):
+            if level >= max(source_size) and levels:
+                continue
+            image.thumbnail((level, level))
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            written += self.__save(self.__path(key, level), image)
+            levels.insert(0, level)
+        index = {"source_size": source_size, "levels": levels}
+        written += self.__save_index(key, index)
+        self.__account(key, written)
+        return index
+
+    def __path(self, key, level=None):
+        """Compute the path of a version, or of the index, of an entry."""
+        name = f"{key}.json" if level is None else f"{key}_{level}.jpg"
+        return os.path.join(self.directory, key[:2], name)
+
+    @staticmethod
+    def __save(path, image):
+        """Save a version as JPEG, returning the file size."""
+        with atomic_write(path) as descriptor:
+            with os.fdopen(os.dup(descriptor), "wb") as file:
+                image.save(file, "jpeg", quality=90)
+        return os.path.getsize(path)
+
+    def __save_index(self, key, index):
+        """Save the index of an entry, returning the file size."""
+        data = json.dumps(index).encode("utf-8")
+        with atomic_write(self.__path(key)) as descriptor:
+            os.write(descriptor, data)
+        return len(data)
+
+    def __read_index(self, key):
+        """Read the index of an entry, marking it as recently used."""
+        path = self.__path(key)
+        try:
+            with open(path, "rb") as file:
+                index = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        with self.__lock:
+            self.__usage.used(key)
+        return index
+
+    def __account(self, key, written):
+        """Update the cache size, removing old entries if it is too big."""
+        with self.__lock:
+            removed = self.__usage.added(key, written)
+            for old in removed:
+                folder = os.path.dirname(self.__path(old))
+                for name in os.listdir(folder):
+                    if name.startswith(old):
+                        os.unlink(os.path.join(folder, name))
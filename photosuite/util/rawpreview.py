@@ -0,0 +1,156 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Extract JPEG previews embedded in RAW files, without ExifTool."""
+
+import mmap
+import struct
+
+# TIFF based formats: TIFF, DNG, CR2, NEF, ARW, PEF, ORF and RW2.
+TIFF_HEADERS = {
+    b"II*\0": "<",
+    b"MM\0*": ">",
+    b"IIRO": "<",
+    b"IIRS": "<",
+    b"IIU\0": "<",
+}
+RAF_HEADER = b"FUJIFILMCCD-RAW"
+
+TAG_COMPRESSION = 259
+TAG_STRIP_OFFSETS = 273
+TAG_STRIP_BYTE_COUNTS = 279
+TAG_SUB_IFDS = 330
+TAG_JPEG_OFFSET = 513
+TAG_JPEG_LENGTH = 514
+JPEG_COMPRESSION = (6, 7)
+
+MAX_IFDS = 64
+
+
+def embedded_jpeg(filename):
+    """
+    Retrieve the largest displayable JPEG embedded in a RAW file.
+
+    The file is memory mapped and its TIFF structure (or Fujifilm RAF
+    header) is parsed directly, so the JPEG is never copied.
+
+    Parameters
+    ----------
+    filename: string
+        The RAW file name.
+
+    Return
+    ------
+    A read-only memoryview with the JPEG data, or None if no embedded
+    JPEG was found or the file format is not supported.
+
+    """
+    with open(filename, "rb") as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return None
+    data = memoryview(mapped)
+    try:
+        if data[: len(RAF_HEADER)] == RAF_HEADER:
+            candidates = [struct.unpack_from(">II", data, 84)]
+        else:
+            candidates = _tiff_jpegs(data)
+    except (struct.error, IndexError, ValueError):
+        candidates = []
+    candidates = [
+        (offset, length)
+        for offset, length in candidates
+        if _is_displayable_jpeg(data, offset, length)
+    ]
+    if not candidates:
+        return None
+    offset, length = max(candidates, key=lambda item: item[1])
+    return data[offset : offset + length]
+
+
+def _tiff_jpegs(data):
+    """List (offset, length) of JPEG images referenced by TIFF IFDs."""
+    order = TIFF_HEADERS.get(bytes(data[:4]))
+    if order is None:
+        return []
+    pending = [struct.unpack_from(order + "I", data, 4)[0]]
+    visited = set()
+    result = []
+    while pending and len(visited) < MAX_IFDS:
+        offset = pending.pop()
+        if offset == 0 or offset in visited or offset >= len(data):
+            continue
+        visited.add(offset)
+        entries, next_ifd = _read_ifd(data, order, offset)
+        pending.append(next_ifd)
+        pending.extend(entries.get(TAG_SUB_IFDS, []))
+        result.extend(_ifd_jpeg(entries))
+    return result
+
+
+def _read_ifd(data, order, offset):
+    """Read the entries of an IFD, and the offset of the next IFD."""
+    count = struct.unpack_from(order + "H", data, offset)[0]
+    entries = {}
+    for index in range(count):
+        entry = offset + 2 + 12 * index
+        tag, kind, size = struct.unpack_from(order + "HHI", data, entry)
+        entries[tag] = _read_values(data, order, entry + 8, kind, size)
+    next_ifd = struct.unpack_from(order + "I", data, offset + 2 + 12 * count)
+    return entries, next_ifd[0]
+
+
+def _read_values(data, order, offset, kind, count):
+    """Read the integer values of an IFD entry."""
+    formats = {3: "H", 4: "I", 13: "I"}  # SHORT, LONG, IFD
+    fmt = formats.get(kind)
+    if fmt is None or count == 0:
+        return []
+    if count * struct.calcsize(fmt) > 4:
+        offset = struct.unpack_from(order + "I", data, offset)[0]
+    return list(struct.unpack_from(f"{order}{count}{fmt}", data, offset))
+
+
+def _ifd_jpeg(entries):
+    """List (offset, length) of JPEG images referenced by an IFD."""
+    if TAG_JPEG_OFFSET in entries and TAG_JPEG_LENGTH in entries:
+        return [(entries[TAG_JPEG_OFFSET][0], entries[TAG_JPEG_LENGTH][0])]
+    compression = entries.get(TAG_COMPRESSION, [0])[0]
+    offsets = entries.get(TAG_STRIP_OFFSETS, [])
+    lengths = entries.get(TAG_STRIP_BYTE_COUNTS, [])
+    if compression in JPEG_COMPRESSION and len(offsets) == len(lengths) == 1:
+        return [(offsets[0], lengths[0])]
+    return []
+
+
+def _is_displayable_jpeg(data, offset, length):
+    """Check if a JPEG is complete and uses a common encoding."""
+    if length < 4 or offset + length > len(data):
+        return False
+    if data[offset : offset + 2] != b"\xff\xd8":
+        return False
+    position, end = offset + 2, offset + length
+    while position + 4 <= end and data[position] == 0xFF:
+        marker = data[position + 1]
+        if marker in (0xC0, 0xC1, 0xC2):  # baseline/progressive frames
+            return True
+        if 0xC3 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return False  # lossless (RAW data) or arithmetic coding
+        size = struct.unpack_from(">H", data, position + 2)[0]
+        position += 2 + size
+    return False
@@ -0,0 +1,190 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Allocate file sequence numbers that survive restarts."""
+
+import os
+import re
+import fcntl
+import string
+import hashlib
+from threading import Lock
+
+JOURNAL_WIDTH = 20
+
+# macOS has no fdatasync.
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+_ALLOCATORS = {}
+_ALLOCATORS_LOCK = Lock()
+
+
+def get_allocator(directory, template):
+    """
+    Retrieve the sequence allocator for a directory and template.
+
+    Allocators are shared in the process, so every formatter using the
+    same directory and template share the same taken names.
+    """
+    key = (os.path.realpath(directory), template)
+    with _ALLOCATORS_LOCK:
+        if key not in _ALLOCATORS:
+            _ALLOCATORS[key] = SequenceAllocator(*key)
+        return _ALLOCATORS[key]
+
+
+def template_pattern(template):
+    """
+    Create a regular expression that matches names created by a template.
+
+    The first sequence field is captured in the group 'seq', and other
+    fields match any text.
+    """
+    pattern = []
+    has_seq = False
+    for literal, field, _spec, _conv in string.Formatter().parse(template):
+        pattern.append(re.escape(literal))
+        if field == "seq" and not has_seq:
+            pattern.append(r"(?P<seq>\d+)")
+            has_seq = True
+        elif field is not None:
+            pattern.append(".*?")
+    return re.compile("".join(pattern))
+
+
+class SequenceAllocator:
+    """
+    Allocate sequence numbers for files in a directory.
+
+    The last allocated number is kept in a journal file in the directory,
+    one for each template, and is incremented while holding an exclusive
+    lock on the journal, so several processes capturing to the same
+    directory never receive the same number. When created, the directory
+    is scanned once for the highest sequence of files matching the
+    template, recovering from lost journals, and the names found are
+    kept in memory to check for collisions.
+    """
+
+    def __init__(self, directory, template):
+        """
+        Initialize the allocator.
+
+        Parameters
+        ----------
+        directory: string
+            The directory where files are created.
+        template: string
+            The FilenameFormatter rule used to name the files.
+
+        """
+        self.directory = directory
+        self.template = template
+        digest = hashlib.blake2b(template.encode("utf-8"), digest_size=8)
+        self.journal = os.path.join(
+            directory, f".tether-{digest.hexdigest()}.seq"
+        )
+        self.__lock = Lock()
+        self.__taken = set()
+        os.makedirs(directory, exist_ok=True)
+        self.__highest = self.__scan(template_pattern(template))
+        self.__fd = os.open(self.journal, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def __scan(self, pattern):
+        """Find the highest sequence and the names used in the directory."""
+        highest = 0
+        recursive = os.sep in self.template
+        for folder, dirs, files in os.walk(self.directory):
+            if not recursive:
+                dirs.clear()
+            for name in files:
+                name = os.path.relpath(
+                    os.path.join(folder, name), self.directory
+                )
+                self.__taken.add(name)
+                match = pattern.fullmatch(name)
+                if match and match.groupdict().get("seq"):
+                    highest = max(highest, int(match.group("seq")))
+        return highest
+
+    def reserve(self, count=1):
+        """
+        Allocate consecutive sequence numbers.
+
+        Parameters
+        ----------
+        count: int
+            The number of sequence numbers to allocate.
+
+        Return
+        ------
+        The first allocated number.
+
+        """
+        with self.__lock:
+            fcntl.flock(self.__fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(self.__fd, JOURNAL_WIDTH, 0)
+                last = max(int(data or 0), self.__highest)
+                record = f"{last + count:0{JOURNAL_WIDTH - 1}}\n"
+                os.pwrite(self.__fd, record.encode("ascii"), 0)
+                _datasync(self.__fd)
+            finally:
+                fcntl.flock(self.__fd, fcntl.LOCK_UN)
+            self.__highest = last + count
+        return last + 1
+
+    @property
+    def last(self):
+        """Retrieve the last sequence number allocated by this process."""
+        return self.__highest
+
+    def is_taken(self, name):
+        """Check if a name, relative to the directory, is in use."""
+        return name in self.__taken
+
+    def claim(self, name):
+        """Mark a name as used, returning False if it was already used."""
+        with self.__lock:
+            if name in self.__taken:
+                return False
+            self.__taken.add(name)
+            return True
+
+    def claim_unique(self, name):
+        """
+        Mark a name as used, changing it if it was already used.
+
+        A '-N' suffix is added before the extension of names already in
+        use, with the lowest N that gives an unused name. Returns the
+        name marked as used.
+        """
+        root, extension = os.path.splitext(name)
+        candidate = name
+        count = 0
+        with self.__lock:
+            while candidate in self.__taken:
+                count += 1
+                candidate = f"{root}-{count}{extension}"
+            self.__taken.add(candidate)
+        return candidate
+
+    def close(self):
+        """Close the journal file."""
+        with self.__lock:
+            if self.__fd is not None:
+                os.close(self.__fd)
+                self.__fd = None
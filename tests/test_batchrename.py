@@ -0,0 +1,144 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test BatchRename with a fake ExifTool pool."""
+
+import os
+
+import pytest
+
+from photosuite.util.batchrename import BatchRename, find_images, undo
+
+
+class FakeExifTool:
+    """An ExifTool pool answering from a dictionary of metadata."""
+
+    def __init__(self, metadata):
+        """Initialize the pool with the metadata of each file."""
+        self.metadata = metadata
+        self.batches = []
+
+    def iter_metadata(self, files, tags=None, batch_size=100):
+        """Produce metadata in batches, omitting unknown files."""
+        files = list(files)
+        for start in range(0, len(files), batch_size):
+            batch = files[start : start + batch_size]
+            self.batches.append(batch)
+            for filename in batch:
+                if filename in self.metadata:
+                    yield {"SourceFile": filename, **self.metadata[filename]}
+
+
+def create(directory, *names):
+    """Create files with their names as content."""
+    paths = []
+    for name in names:
+        path = directory / name
+        path.write_text(name)
+        paths.append(str(path))
+    return paths
+
+
+def exif_date(day):
+    """Create metadata with a capture date."""
+    return {"EXIF:DateTimeOriginal": f"2019:03:{day:02d} 10:00:00"}
+
+
+def test_find_images_ignores_hidden_and_unknown(tmp_path):
+    """Only visible files with image extensions are found."""
+    (tmp_path / ".hidden").mkdir()
+    create(tmp_path, "b.CR2", "a.jpg", "notes.txt", ".a.jpg")
+    create(tmp_path / ".hidden", "c.jpg")
+    assert find_images(str(tmp_path)) == [
+        str(tmp_path / "a.jpg"),
+        str(tmp_path / "b.CR2"),
+    ]
+
+
+def test_plan_in_capture_order(tmp_path):
+    """Files are named in capture order, metadata is matched by name."""
+    first, second, third = create(tmp_path, "x.jpg", "y.jpg", "z.jpg")
+    exiftool = FakeExifTool(
+        {
+            first: exif_date(3),
+            second: exif_date(1),
+            third: {**exif_date(2), "EXIF:Model": "EOS"},
+        }
+    )
+    rename = BatchRename(exiftool, "{seq}_{model}.{ext}", batch_size=2)
+    plan = rename.plan([first, second, third])
+    assert exiftool.batches == [[first, second], [third]]
+    assert not plan.conflicts
+    assert plan.renames == [
+        (second, str(tmp_path / "1_.jpg")),
+        (third, str(tmp_path / "2_EOS.jpg")),
+        (first, str(tmp_path / "3_.jpg")),
+    ]
+
+
+def test_files_without_metadata_are_skipped(tmp_path):
+    """Files ExifTool does not answer for are reported, not renamed."""
+    known, unknown = create(tmp_path, "a.jpg", "b.jpg")
+    exiftool = FakeExifTool({known: exif_date(1)})
+    plan = BatchRename(exiftool, "{seq}.{ext}").plan([unknown, known])
+    assert plan.renames == [(known, str(tmp_path / "1.jpg"))]
+    assert plan.skipped == [unknown]
+
+
+def test_conflicts(tmp_path):
+    """Targets used by several files, or by other files, are conflicts."""
+    first, second, _ = create(tmp_path, "a.jpg", "b.jpg", "fixed.jpg")
+    exiftool = FakeExifTool({first: exif_date(1), second: exif_date(2)})
+    plan = BatchRename(exiftool, "fixed.{ext}").plan([first, second])
+    assert plan.conflicts == {str(tmp_path / "fixed.jpg"): [first, second]}
+    with pytest.raises(Exception):
+        BatchRename(exiftool, "fixed.{ext}").execute(plan)
+
+
+def test_execute_swap_and_undo(tmp_path):
+    """Files can take each other names, and the rename can be undone."""
+    first, second = create(tmp_path, "1.jpg", "2.jpg")
+    exiftool = FakeExifTool({first: exif_date(2), second: exif_date(1)})
+    rename = BatchRename(exiftool, "{seq}.{ext}")
+    plan = rename.plan([first, second])
+    log = rename.execute(plan, log=str(tmp_path / "rename.log"))
+    assert (tmp_path / "1.jpg").read_text() == "2.jpg"
+    assert (tmp_path / "2.jpg").read_text() == "1.jpg"
+    undo(log)
+    assert (tmp_path / "1.jpg").read_text() == "1.jpg"
+    assert (tmp_path / "2.jpg").read_text() == "2.jpg"
+
+
+def test_copy_to_target(tmp_path):
+    """Copied files are kept, and undo removes the copies."""
+    source = tmp_path / "card"
+    source.mkdir()
+    (image,) = create(source, "IMG_0001.CR2")
+    target = tmp_path / "archive"
+    exiftool = FakeExifTool({image: exif_date(7)})
+    rename = BatchRename(
+        exiftool,
+        "{YYYY}{MM}{DD}/{filename}.{ext}",
+        target=str(target),
+        copy=True,
+    )
+    log = rename.execute(rename.plan([image]), log=str(tmp_path / "copy.log"))
+    assert (target / "20190307" / "IMG_0001.cr2").exists()
+    assert os.path.exists(image)
+    undo(log)
+    assert not (target / "20190307" / "IMG_0001.cr2").exists()
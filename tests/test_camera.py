@@ -0,0 +1,207 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test how Camera applies settings, with a fake camera driver."""
+
+import time
+import threading
+
+import pytest
+
+from photosuite.camera.camera import Camera
+from photosuite.camera.cameradriver import CameraDriver
+from photosuite.camera.errors import CameraError
+
+CHOICES = {
+    "iso": ["100", "200", "400"],
+    "shutterspeed": ["1/250", "1/125"],
+    "aperture": ["f/4", "f/5.6"],
+}
+
+
+class FakeDriver(CameraDriver):
+    """A camera driver that keeps settings in a dictionary."""
+
+    def __init__(self):
+        """Initialize the driver with the first value of each setting."""
+        self.values = {name: choices[0] for name, choices in CHOICES.items()}
+        self.writes = []
+        self.log = []
+        self.delay = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail_writes = False
+        self.target = "card"
+        self.__lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """Lock that grants exclusive access to the camera."""
+        return self.__lock
+
+    def get_choices_for(self, setting):
+        """Retrieve the valid values of a setting."""
+        return CHOICES.get(setting)
+
+    def get_value_for(self, setting):
+        """Retrieve the value of a setting."""
+        return self.values[setting]
+
+    def invalidate_config(self, setting=None):
+        """Nothing is cached."""
+
+    def set_values(self, settings):
+        """Record and apply written settings."""
+        with self.__lock:
+            if self.fail_writes:
+                raise CameraError("Write failed.")
+            time.sleep(self.delay)
+            self.writes.append(dict(settings))
+            self.log.append(("set", dict(settings)))
+            self.values.update(settings)
+
+    @property
+    def capture_target(self):
+        """Query where captured images are stored."""
+        return self.target
+
+    @capture_target.setter
+    def capture_target(self, target):
+        """Select where captured images are stored."""
+        self.target = target
+
+    def can_capture_image(self):
+        """Query if the camera can capture images."""
+        return True
+
+    def trigger_capture(self):
+        """Wait for the release event."""
+        self.release.wait(2)
+        with self.__lock:
+            self.log.append(("trigger", dict(self.values)))
+        return "/store", "IMG_0001.CR2"
+
+    def download_file(self, folder, name, filename, **_kwargs):
+        """Pretend the frame was saved."""
+        return filename
+
+
+@pytest.fixture
+def camera():
+    """Create a camera with a fake driver."""
+    result = Camera(FakeDriver())
+    yield result
+    result.close()
+
+
+def driver_of(camera):
+    """Retrieve the fake driver of a camera."""
+    return camera._Camera__cam  # pylint: disable=protected-access
+
+
+def test_only_changed_settings_are_written(camera):
+    """Settings already applied are not written again."""
+    driver = driver_of(camera)
+    camera.grab_frame_async("a.cr2", iso="200").result(2)
+    assert driver.writes == [
+        {"shutterspeed": "1/250", "aperture": "f/4", "iso": "200"}
+    ]
+    camera.grab_frame_async("b.cr2", iso="200").result(2)
+    camera.grab_frame_async("c.cr2", iso="400").result(2)
+    assert driver.writes[1:] == [{"iso": "400"}]
+
+
+def test_cancelled_capture_does_not_apply_settings(camera):
+    """Settings of a cancelled request are written by later captures."""
+    driver = driver_of(camera)
+    camera.grab_frame_async("a.cr2").result(2)
+    driver.release.clear()
+    first = camera.grab_frame_async("b.cr2")
+    cancelled = camera.grab_frame_async("c.cr2", iso="200")
+    assert cancelled.cancel()
+    driver.release.set()
+    first.result(2)
+    camera.grab_frame_async("d.cr2", iso="200").result(2)
+    assert driver.values["iso"] == "200"
+
+
+def test_failed_write_forgets_applied_settings(camera):
+    """After a failed write every setting is written again."""
+    driver = driver_of(camera)
+    camera.grab_frame_async("a.cr2").result(2)
+    driver.fail_writes = True
+    with pytest.raises(CameraError):
+        camera.grab_frame_async("b.cr2", iso="400").result(2)
+    driver.fail_writes = False
+    camera.grab_frame_async("c.cr2").result(2)
+    assert driver.writes[-1] == {
+        "shutterspeed": "1/250",
+        "aperture": "f/4",
+        "iso": "100",
+    }
+
+
+def test_config_changed_outside_forgets_applied_settings(camera):
+    """Settings changed on the camera body are written again."""
+    driver = driver_of(camera)
+    camera.grab_frame_async("a.cr2").result(2)
+    driver.values["iso"] = "400"
+    camera.on_config_changed(None)
+    camera.grab_frame_async("b.cr2").result(2)
+    assert driver.values["iso"] == "100"
+
+
+def test_capture_waits_for_pending_setting_write():
+    """A capture right after a model change uses the new value."""
+    driver = FakeDriver()
+    camera = Camera(driver, set_on_capture=False)
+    try:
+        camera.grab_frame_async("a.cr2").result(2)
+        driver.delay = 0.1
+        camera.models["iso"].next()
+        camera.grab_frame_async("b.cr2").result(2)
+    finally:
+        camera.close()
+    assert driver.log[-1] == (
+        "trigger",
+        {"iso": "200", "shutterspeed": "1/250", "aperture": "f/4"},
+    )
+    assert driver.writes.count({"iso": "200"}) == 1
+
+
+def test_changed_setting_is_written_again(camera):
+    """Only settings reported as changed are written again."""
+    driver = driver_of(camera)
+    camera.grab_frame_async("a.cr2").result(2)
+    driver.values["iso"] = "400"
+    camera.on_config_changed(None, ("iso",))
+    camera.on_config_changed(None, ())
+    camera.grab_frame_async("b.cr2").result(2)
+    assert driver.writes[-1] == {"iso": "100"}
+
+
+def test_capture_target_option():
+    """The capture target is selected only if the option is given."""
+    driver = FakeDriver()
+    Camera(driver).close()
+    assert driver.target == "card"
+    camera = Camera(driver, capture_target="sdram")
+    assert driver.target == "sdram"
+    camera.capture_target = "card"
+    assert camera.capture_target == "card"
+    camera.close()
@@ -0,0 +1,138 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test CaptureQueue with a fake camera driver."""
+
+import threading
+
+import pytest
+
+from photosuite.camera.cameradriver import CameraDriver
+from photosuite.camera.capturequeue import CaptureQueue
+from photosuite.camera.errors import CameraError
+
+
+class FakeDriver(CameraDriver):
+    """A camera driver that records what is done to it."""
+
+    def __init__(self):
+        """Initialize the driver."""
+        self.calls = []
+        self.shots = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+        self.__lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """Lock that grants exclusive access to the camera."""
+        return self.__lock
+
+    def set_values(self, settings):
+        """Record written settings."""
+        self.calls.append(("set", dict(settings)))
+
+    def trigger_capture(self):
+        """Wait for the release event and name the new frame."""
+        self.release.wait(2)
+        if self.fail:
+            raise CameraError("Capture failed.")
+        self.shots += 1
+        self.calls.append(("trigger", self.shots))
+        return "/store", f"IMG_{self.shots:04d}.CR2"
+
+    def download_file(self, folder, name, filename, **_kwargs):
+        """Record downloads."""
+        self.calls.append(("download", f"{folder}/{name}", filename))
+        return filename
+
+
+def test_requests_are_processed_in_order():
+    """Settings are written before release, and frames downloaded."""
+    driver = FakeDriver()
+    events = []
+    with CaptureQueue(driver) as queue:
+        first = queue.submit(
+            "first.cr2",
+            {"iso": 200},
+            before_release=lambda: events.append("before"),
+            after_release=lambda: events.append("after"),
+        )
+        second = queue.submit(lambda name: "renamed_" + name)
+        assert first.result(2) == "first.cr2"
+        assert second.result(2) == "renamed_IMG_0002.CR2"
+        third = queue.submit()
+        assert third.result(2) == "IMG_0003.CR2"
+    assert not queue.is_running
+    assert events == ["before", "after"]
+    assert driver.calls[:2] == [("set", {"iso": 200}), ("trigger", 1)]
+    assert ("download", "/store/IMG_0001.CR2", "first.cr2") in driver.calls
+
+
+def test_failed_requests_do_not_stop_the_queue():
+    """A failure is set in the request future, and later ones run."""
+    driver = FakeDriver()
+    with CaptureQueue(driver) as queue:
+        driver.fail = True
+        failed = queue.submit("a.cr2")
+        with pytest.raises(CameraError):
+            failed.result(2)
+        driver.fail = False
+        assert queue.submit("b.cr2").result(2) == "b.cr2"
+
+
+def test_before_release_failure_skips_capture():
+    """If before_release raises, the shutter is not released."""
+    driver = FakeDriver()
+
+    def refuse():
+        raise ValueError("not now")
+
+    with CaptureQueue(driver) as queue:
+        with pytest.raises(ValueError):
+            queue.submit("a.cr2", before_release=refuse).result(2)
+    assert driver.shots == 0
+
+
+def test_cancelled_requests_are_skipped():
+    """Requests cancelled while waiting never touch the camera."""
+    driver = FakeDriver()
+    driver.release.clear()
+    with CaptureQueue(driver) as queue:
+        first = queue.submit("a.cr2")
+        cancelled = queue.submit("b.cr2", {"iso": 400})
+        assert cancelled.cancel()
+        driver.release.set()
+        assert first.result(2) == "a.cr2"
+    assert ("set", {"iso": 400}) not in driver.calls
+    assert driver.shots == 1
+
+
+def test_submit_errors():
+    """Requests need a running queue with room for them."""
+    driver = FakeDriver()
+    queue = CaptureQueue(driver, max_pending=1)
+    with pytest.raises(CameraError):
+        queue.submit()
+    driver.release.clear()
+    with queue:
+        with pytest.raises(CameraError):
+            for _ in range(4):
+                queue.submit(block=False)
+        driver.release.set()
@@ -0,0 +1,110 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test BatchDownloader with a fake camera driver."""
+
+import os
+import threading
+
+import pytest
+
+from photosuite.camera.cameradriver import CameraDriver, CameraEvent
+from photosuite.camera.downloader import BatchDownloader
+
+
+class FakeDriver(CameraDriver):
+    """A camera driver with files in a dictionary, and queued events."""
+
+    def __init__(self, files):
+        """Initialize the camera storage, and its FILE_ADDED events."""
+        self.files = dict(files)
+        self.events = [(CameraEvent.FILE_ADDED, ("/store", n)) for n in files]
+        self.__lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """Lock that grants exclusive access to the camera."""
+        return self.__lock
+
+    def wait_for_event(self, timeout):
+        """Retrieve the next queued event, or a timeout."""
+        if self.events:
+            return self.events.pop(0)
+        return CameraEvent.TIMEOUT, None
+
+    def download_file(self, folder, name, filename, **_kwargs):
+        """Save a file from the camera storage."""
+        with open(filename, "wb") as file:
+            file.write(self.files[name])
+        return filename
+
+    def get_file_size(self, folder, name):
+        """Retrieve the size of a file on the camera storage."""
+        return len(self.files[name])
+
+    def delete_file(self, folder, name):
+        """Remove a file from the camera storage."""
+        del self.files[name]
+
+
+def test_batches_are_drained_from_events(tmp_path):
+    """Files added on camera are downloaded in batches."""
+    driver = FakeDriver({"a.jpg": b"a", "b.jpg": b"bb", "c.jpg": b"ccc"})
+    downloader = BatchDownloader(driver, str(tmp_path), batch_size=2)
+    assert downloader.collect() == [("/store", "a.jpg"), ("/store", "b.jpg")]
+    assert downloader.collect() == [("/store", "c.jpg")]
+    assert not downloader.collect()
+
+
+def test_files_are_deleted_after_saved(tmp_path):
+    """Saved files are removed from camera, if configured."""
+    driver = FakeDriver({"a.jpg": b"a"})
+    results = []
+    downloader = BatchDownloader(
+        driver,
+        str(tmp_path),
+        delete_after=True,
+        filename=str.upper,
+        callback=results.append,
+    )
+    downloader.download(downloader.collect())
+    assert results == [os.path.join(str(tmp_path), "A.JPG")]
+    assert not driver.files
+
+
+def test_added_files_are_downloaded_in_background(tmp_path):
+    """Files added explicitly are downloaded by the background thread."""
+    driver = FakeDriver({"a.jpg": b"a"})
+    driver.events.clear()
+    done = threading.Event()
+    with BatchDownloader(
+        driver,
+        str(tmp_path),
+        poll_events=False,
+        timeout=10,
+        callback=lambda _result: done.set(),
+    ) as downloader:
+        downloader.add("/store", "a.jpg")
+        assert done.wait(2)
+    assert (tmp_path / "a.jpg").read_bytes() == b"a"
+
+
+def test_unknown_option():
+    """Options not known by the downloader are rejected."""
+    with pytest.raises(TypeError):
+        BatchDownloader(FakeDriver({}), ".", batchsize=2)
@@ -0,0 +1,132 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Test EventPump with a fake camera driver."""
+
+import time
+import threading
+from queue import Queue, Empty
+
+from photosuite.camera.cameradriver import CameraDriver, CameraEvent
+from photosuite.camera.eventpump import EventPump
+
+
+class FakeDriver(CameraDriver):
+    """A camera driver that produces queued events."""
+
+    def __init__(self, events=()):
+        """Initialize the driver with the events to produce."""
+        self.events = Queue()
+        for event in events:
+            self.events.put(event)
+        self.waits = 0
+        self.__lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """Lock that grants exclusive access to the camera."""
+        return self.__lock
+
+    def wait_for_event(self, timeout):
+        """Produce the next queued event, or TIMEOUT."""
+        with self.__lock:
+            self.waits += 1
+            try:
+                event = self.events.get(timeout=timeout / 1000)
+            except Empty:
+                return CameraEvent.TIMEOUT, None
+            if isinstance(event, Exception):
+                raise event
+            return event
+
+
+def wait_until(condition, timeout=2.0):
+    """Wait for a condition to become true."""
+    limit = time.monotonic() + timeout
+    while not condition() and time.monotonic() < limit:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_pump_dispatches_events_to_signals():
+    """Each camera event is notified to the matching signal."""
+    driver = FakeDriver(
+        [
+            (CameraEvent.FILE_ADDED, ("/store", "IMG_0001.CR2")),
+            (CameraEvent.FOLDER_ADDED, ("/store", "100CANON")),
+            (CameraEvent.CAPTURE_COMPLETE, None),
+            (CameraEvent.UNKNOWN, "ignored"),
+        ]
+    )
+    pump = EventPump(driver, timeout=5)
+    received = []
+    for signal in ["file_added", "folder_added", "capture_complete"]:
+        pump.connect(
+            signal,
+            lambda sender, data, signal=signal: received.append(
+                (sender, signal, data)
+            ),
+        )
+    for _ in range(4):
+        pump.pump()
+    assert received == [
+        (pump, "file_added", ("/store", "IMG_0001.CR2")),
+        (pump, "folder_added", ("/store", "100CANON")),
+        (pump, "capture_complete", None),
+    ]
+    assert pump.pump() == CameraEvent.TIMEOUT
+
+
+def test_running_pump_notifies_from_thread_and_stops():
+    """The pump thread notifies events, and stops when requested."""
+    driver = FakeDriver([(CameraEvent.CONFIG_CHANGED, ("iso",))])
+    received = []
+    pump = EventPump(driver, timeout=5, idle=5)
+    pump.connect("config_changed", lambda _s, data: received.append(data))
+    with pump:
+        assert pump.is_running
+        assert wait_until(lambda: received == [("iso",)])
+    assert not pump.is_running
+    waits = driver.waits
+    time.sleep(0.05)
+    assert driver.waits == waits
+
+
+def test_errors_are_notified_and_pump_continues():
+    """Driver errors are notified, and events are still pumped."""
+    driver = FakeDriver(
+        [RuntimeError("USB"), (CameraEvent.FILE_ADDED, ("/", "a.jpg"))]
+    )
+    errors, files = [], []
+    pump = EventPump(driver, timeout=5, idle=5)
+    pump.connect("error", lambda _s, ex: errors.append(str(ex)))
+    pump.connect("file_added", lambda _s, data: files.append(data))
+    with pump:
+        assert wait_until(lambda: files == [("/", "a.jpg")])
+    assert errors == ["USB"]
+
+
+def test_camera_is_free_between_idle_waits():
+    """Other threads can take the camera while the pump is idle."""
+    driver = FakeDriver()
+    with EventPump(driver, timeout=20, idle=20):
+        assert wait_until(lambda: driver.waits > 0)
+        start = time.monotonic()
+        for _ in range(5):
+            with driver.lock:
+                pass
+        assert time.monotonic() - start < 0.5
@@ -0,0 +1,81 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test the conversion of exposure values to stops."""
+
+import pytest
+
+from photosuite.camera.util.exposure import (
+    aperture_stops,
+    compensation_stops,
+    iso_stops,
+    shutter_stops,
+)
+
+
+@pytest.mark.parametrize(
+    "value,stops",
+    [("1/250", -7.966), ("0.5", -1), ("30", 4.907), ("30s", 4.907)],
+)
+def test_shutter_stops(value, stops):
+    """Shutter speeds are fractions or seconds, with an optional unit."""
+    assert shutter_stops(value) == pytest.approx(stops, abs=1e-3)
+
+
+def test_shutter_stops_with_marks():
+    """Speeds such as 1"3 are read as decimal seconds."""
+    assert shutter_stops('1"3') == pytest.approx(shutter_stops("1.3"))
+
+
+@pytest.mark.parametrize("value", ["f/5.6", "f5.6", "5.6", 5.6])
+def test_aperture_stops(value):
+    """Apertures are read with or without their prefix."""
+    assert aperture_stops(value) == pytest.approx(4.971, abs=1e-3)
+
+
+@pytest.mark.parametrize(
+    "value,stops", [("100", 0), ("200", 1), (400, 2), ("50", -1)]
+)
+def test_iso_stops(value, stops):
+    """ISO speeds are relative to ISO 100."""
+    assert iso_stops(value) == pytest.approx(stops)
+
+
+@pytest.mark.parametrize(
+    "value,stops",
+    [("0", 0), ("+1/3", 1 / 3), ("-0.7", -0.7), ("+1 2/3", 5 / 3)],
+)
+def test_compensation_stops(value, stops):
+    """Compensations are signed, and may have whole and fractional parts."""
+    assert compensation_stops(value) == pytest.approx(stops)
+
+
+@pytest.mark.parametrize(
+    "convert,value",
+    [
+        (shutter_stops, "Bulb"),
+        (shutter_stops, "1/0"),
+        (aperture_stops, "implicit auto"),
+        (iso_stops, "Auto"),
+        (iso_stops, "Hi 1"),
+        (compensation_stops, "Auto"),
+    ],
+)
+def test_values_not_on_scale(convert, value):
+    """Values which are not numbers are not on the scale."""
+    assert convert(value) is None
@@ -0,0 +1,110 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test FilenameFormatter."""
+
+import datetime
+
+from photosuite.util.formatter import FilenameFormatter
+
+DATE = datetime.datetime(2019, 3, 7, 10, 30)
+
+
+def test_fields_from_file_date_and_user_keys():
+    """Filenames combine file, date and user fields."""
+    formatter = FilenameFormatter(
+        "{YYYY}{MM}{DD}_{session}_{filename}.{ext}", date=DATE
+    )
+    formatter.set("session", "studio")
+    assert formatter.get_filename("/card/IMG_0001.CR2") == (
+        "20190307_studio_IMG_0001.cr2"
+    )
+
+
+def test_sequence_counter_without_directory():
+    """The sequence starts after the initial value."""
+    formatter = FilenameFormatter("{seq:03d}.{EXT}", initial=9)
+    names = formatter.get_filenames(["a.jpg", "b.jpg"])
+    assert names == ["010.JPG", "011.JPG"]
+    assert formatter.counter == 11
+
+
+def test_keyword_overrides():
+    """Keyword arguments override fields for a single call."""
+    formatter = FilenameFormatter("{seq}_{camera}", date=DATE)
+    formatter.set("camera", "A")
+    assert formatter.get_filename("x.jpg", seq=42, camera="B") == "42_B"
+
+
+def test_date_change_formats_date_again():
+    """Date fields follow the date set after the first filename."""
+    formatter = FilenameFormatter("{YYYY}-{MM}-{DD}", date=DATE)
+    assert formatter.filename == "2019-03-07"
+    formatter.date = DATE + datetime.timedelta(days=30)
+    assert formatter.filename == "2019-04-06"
+
+
+def test_rule_change_recompiles():
+    """Changing the rule is used by the next filename."""
+    formatter = FilenameFormatter("{filename}")
+    assert formatter.get_filename("dir/name.jpg") == "name"
+    formatter.rename_rule = "{original}"
+    assert formatter.get_filename("dir/name.jpg") == "name.jpg"
+
+
+def test_directory_skips_taken_sequences(tmp_path):
+    """With a directory, sequences skip names already used."""
+    (tmp_path / "IMG_0002.jpg").write_bytes(b"")
+    (tmp_path / "IMG_0004.jpg").write_bytes(b"")
+    rule = "IMG_{seq:04d}.{ext}"
+    formatter = FilenameFormatter(rule, directory=str(tmp_path))
+    assert formatter.get_filenames(["a.jpg", "b.jpg"]) == [
+        "IMG_0005.jpg",
+        "IMG_0006.jpg",
+    ]
+    other = FilenameFormatter(rule, directory=str(tmp_path))
+    assert other.get_filename("c.jpg") == "IMG_0007.jpg"
+
+
+def test_directory_without_sequence_adds_suffix(tmp_path):
+    """Rules without a sequence add a suffix to names already used."""
+    (tmp_path / "shot.jpg").write_bytes(b"")
+    formatter = FilenameFormatter("{original}", directory=str(tmp_path))
+    assert formatter.get_filenames(["shot.jpg", "shot.jpg"]) == [
+        "shot-1.jpg",
+        "shot-2.jpg",
+    ]
+
+
+def test_directory_with_given_sequence_adds_suffix(tmp_path):
+    """A given sequence is kept, with a suffix if the name is taken."""
+    (tmp_path / "IMG_0005.jpg").write_bytes(b"")
+    formatter = FilenameFormatter(
+        "IMG_{seq:04d}.{ext}", directory=str(tmp_path)
+    )
+    assert formatter.get_filename("a.jpg", seq=5) == "IMG_0005-1.jpg"
+    assert formatter.get_filename("b.jpg", seq=6) == "IMG_0006.jpg"
+
+
+def test_allocator_created_on_first_filename(tmp_path):
+    """Creating a formatter does not touch the directory."""
+    directory = tmp_path / "session"
+    formatter = FilenameFormatter("{seq}.jpg", directory=str(directory))
+    assert not directory.exists()
+    assert formatter.get_filename("a.jpg") == "1.jpg"
+    assert directory.exists()
@@ -0,0 +1,98 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test LiveView with a fake camera driver."""
+
+import time
+import threading
+
+from photosuite.camera.cameradriver import CameraDriver
+from photosuite.camera.liveview import FrameRing, LiveView
+
+
+class FakeDriver(CameraDriver):
+    """A camera driver that produces preview frames, or fails."""
+
+    def __init__(self):
+        """Initialize the driver."""
+        self.fail = threading.Event()
+        self.__lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """Lock that grants exclusive access to the camera."""
+        return self.__lock
+
+    def capture_preview(self):
+        """Produce a frame, or fail if asked to."""
+        time.sleep(0.001)
+        if self.fail.is_set():
+            raise OSError("Camera disconnected.")
+        data = bytearray(b"\xff\xd8frame\xff\xd9")
+        return data, data
+
+
+def wait_until(condition, timeout=2.0):
+    """Wait for a condition to become true."""
+    limit = time.monotonic() + timeout
+    while not condition() and time.monotonic() < limit:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_frame_ring_keeps_newest():
+    """Consumers get the newest frame, older ones are dropped."""
+    ring = FrameRing(2)
+    for frame in ["a", "b", "c"]:
+        ring.put(frame)
+    assert ring.latest() == "c"
+    assert ring.dropped == 2
+    assert ring.latest() is None
+
+
+def test_frames_are_captured_until_stopped():
+    """Frames are numbered in capture order."""
+    with LiveView(FakeDriver()) as live_view:
+        first = live_view.frames.latest(2)
+        assert wait_until(lambda: live_view.fps > 0)
+        second = live_view.frames.latest(2)
+    assert not live_view.is_running
+    assert bytes(first.data) == b"\xff\xd8frame\xff\xd9"
+    assert second.sequence > first.sequence
+
+
+def test_failure_is_reported_and_live_view_restarts():
+    """A capture failure stops the thread, and is notified."""
+    driver = FakeDriver()
+    live_view = LiveView(driver)
+    errors = []
+    live_view.connect("error", lambda _, error: errors.append(error))
+    driver.fail.set()
+    live_view.start()
+    assert wait_until(lambda: errors)
+    assert not live_view.is_running
+    assert isinstance(live_view.error, OSError)
+    assert errors == [live_view.error]
+    driver.fail.clear()
+    live_view.start()
+    try:
+        assert live_view.is_running
+        assert live_view.frames.latest(2) is not None
+        assert live_view.error is None
+    finally:
+        live_view.stop()
@@ -0,0 +1,123 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test the Notifiable signaling mechanism."""
+
+import gc
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from photosuite.camera.util.notify import Notifiable, asyncio_loop, executor
+
+
+class Sender(Notifiable):
+    """An object exposing signals."""
+
+    def __init__(self, **kwargs):
+        """Initialize the signals."""
+        super().__init__(connectors=["changed", "done"], **kwargs)
+
+    def notify(self, connectors, *args):
+        """Notify receivers."""
+        self._notify(connectors, *args)
+
+
+class Receiver:
+    """An object which method receives notifications."""
+
+    def __init__(self):
+        """Initialize the received notifications."""
+        self.received = []
+
+    def receive(self, sender, *args):
+        """Record a notification."""
+        self.received.append((sender, args))
+
+
+def test_invalid_connectors():
+    """Signals must be listed, and connected signals must exist."""
+    with pytest.raises(ValueError):
+        Notifiable()
+    with pytest.raises(ValueError):
+        Sender().connect("missing", print)
+
+
+def test_receivers_called_in_order():
+    """Receivers are called once, in the order they were connected."""
+    sender = Sender()
+    calls = []
+
+    def first(origin, value):
+        calls.append(("first", origin, value))
+
+    def second(origin, value):
+        calls.append(("second", origin, value))
+
+    sender.connect("changed", first)
+    sender.connect("changed", second)
+    sender.connect("changed", first)
+    sender.notify(["changed", "done"], 1)
+    assert calls == [("first", sender, 1), ("second", sender, 1)]
+    sender.disconnect("changed", first)
+    sender.notify(["changed"], 2)
+    assert calls[-1] == ("second", sender, 2)
+    assert len(calls) == 3
+
+
+def test_bound_methods_are_weak():
+    """Connecting a method does not keep its object alive."""
+    sender = Sender()
+    receiver = Receiver()
+    sender.connect("changed", receiver.receive)
+    sender.notify(["changed"], 1)
+    assert receiver.received == [(sender, (1,))]
+    reference = weakref.ref(receiver)
+    del receiver
+    gc.collect()
+    assert reference() is None
+    sender.notify(["changed"], 2)
+
+
+def test_executor_dispatch():
+    """Receivers may be called in another thread."""
+    sender = Sender()
+    calls = []
+    with ThreadPoolExecutor(1) as pool:
+        sender.connect("done", lambda *args: calls.append(args), executor(pool))
+        sender.notify(["done"], "value")
+    assert calls == [(sender, "value")]
+
+
+def test_coalesced_notifications():
+    """Pending coalesced notifications are delivered once, the latest."""
+    loop = asyncio.new_event_loop()
+    try:
+        sender = Sender(dispatch=asyncio_loop(loop), coalesce=["changed"])
+        changes, done = [], []
+        sender.connect("changed", lambda _, value: changes.append(value))
+        sender.connect("done", lambda _, value: done.append(value))
+        for value in range(5):
+            sender.notify(["changed", "done"], value)
+        loop.run_until_complete(asyncio.sleep(0))
+    finally:
+        loop.close()
+    assert changes == [4]
+    assert done == [0, 1, 2, 3, 4]
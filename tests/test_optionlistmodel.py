@@ -0,0 +1,99 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test the option list model, and its scale positions."""
+
+import pytest
+
+from photosuite.camera.util.exposure import (
+    FULL_STOP,
+    THIRD_STOP,
+    iso_stops,
+    shutter_stops,
+)
+from photosuite.camera.util.optionlistmodel import OptionListModel
+
+SHUTTER = ["1/250", "1/200", "1/160", "1/125", "Bulb"]
+ISO = ["Auto", "100", "200", "400"]
+
+
+def record(model):
+    """Record the signals notified by a model."""
+    signals = []
+    for connector in ["previous", "next", "changed"]:
+
+        def receive(_sender, connector=connector):
+            signals.append(connector)
+
+        model.connect(connector, receive)
+    # Receivers are kept alive by the model, so no reference is needed.
+    return signals
+
+
+def test_index_at_nearest_position():
+    """The index of the value nearest to a position is retrieved."""
+    model = OptionListModel(ISO, value="100", scale=iso_stops)
+    assert model.get_index_at(None) == -1
+    assert model.get_index_at(-10) == 1
+    assert model.get_index_at(10) == 3
+    assert model.get_index_at(1.4) == 2
+    assert model.get_index_at(1.6) == 3
+    # Ties are resolved to the lower position.
+    assert model.get_index_at(0.5) == 1
+
+
+def test_index_at_without_scale():
+    """Without a scale, or values on it, no position has an index."""
+    assert OptionListModel(ISO).get_index_at(0) == -1
+    assert OptionListModel(["Auto"], scale=iso_stops).get_index_at(0) == -1
+
+
+def test_initial_value_falls_back_to_nearest():
+    """Unknown initial values use the nearest value on the scale."""
+    model = OptionListModel(ISO, value="320", scale=iso_stops)
+    assert model.value == "400"
+    assert OptionListModel(ISO, value="unknown").value == "Auto"
+    with pytest.raises(ValueError):
+        OptionListModel(ISO, index=len(ISO))
+
+
+def test_step_moves_on_scale():
+    """Stepping moves to the value nearest to the new position."""
+    model = OptionListModel(SHUTTER, value="1/250", scale=shutter_stops)
+    signals = record(model)
+    model.step(THIRD_STOP)
+    assert model.value == "1/200"
+    model.step(FULL_STOP)
+    assert model.value == "1/125"
+    model.step(-FULL_STOP)
+    assert model.value == "1/250"
+    model.step(-FULL_STOP)
+    assert model.value == "1/250"
+    assert signals == ["next", "changed"] * 2 + ["previous", "changed"] * 2
+
+
+def test_step_does_nothing():
+    """Null steps, and values not on the scale, do not move or notify."""
+    model = OptionListModel(SHUTTER, value="1/160", scale=shutter_stops)
+    signals = record(model)
+    model.step(0)
+    assert model.value == "1/160"
+    model.current = SHUTTER.index("Bulb")
+    model.step(THIRD_STOP)
+    assert model.value == "Bulb"
+    assert not signals
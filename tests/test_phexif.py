@@ -0,0 +1,139 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test ResponseReader with a pipe standing for ExifTool output."""
+
+import os
+import sys
+import stat
+
+import pytest
+
+from photosuite.util.phexif import (
+    ExifToolPool,
+    PipelinedExifTool,
+    ResponseReader,
+    ResponseTooLarge,
+)
+
+# Answers '-j' requests with the files which names start with 'IMG',
+# writing nothing if there are none, as ExifTool does, and exits when
+# asked for a file named 'crash'.
+FAKE_EXIFTOOL = """
+import sys, json
+args = []
+for line in sys.stdin:
+    line = line.rstrip("\\n")
+    if line.startswith("-execute"):
+        if "crash" in args:
+            sys.exit(1)
+        found = [{"SourceFile": a} for a in args if a.startswith("IMG")]
+        output = json.dumps(found) if found else ""
+        sys.stdout.write(output + "\\n{ready%s}\\n" % line[8:])
+        sys.stdout.flush()
+        args = []
+    elif line == "False":
+        break
+    elif line != "-stay_open":
+        args.append(line)
+"""
+
+
+@pytest.fixture
+def pipe():
+    """Create a pipe, returning its read and write ends."""
+    read_fd, write_fd = os.pipe()
+    yield read_fd, write_fd
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_reads_numbered_and_plain_responses(pipe):
+    """Responses are split at marks, with their sequence numbers."""
+    read_fd, write_fd = pipe
+    os.write(write_fd, b'[{"a": 1}]\n{ready7}\n[]\r\n{ready}\r\n')
+    reader = ResponseReader(read_fd)
+    assert reader.read() == (7, b'[{"a": 1}]')
+    assert reader.read() == (None, b"[]")
+
+
+def test_mark_split_between_reads(pipe):
+    """A mark split between reads is found."""
+    read_fd, write_fd = pipe
+    reader = ResponseReader(read_fd, chunk_size=4)
+    os.write(write_fd, b"data{rea")
+    os.write(write_fd, b"dy12}\nmore{ready13}\n")
+    assert reader.read() == (12, b"data")
+    assert reader.read() == (13, b"more")
+
+
+def test_large_response_is_discarded(pipe):
+    """Responses larger than the maximum raise, and reading continues."""
+    read_fd, write_fd = pipe
+    reader = ResponseReader(read_fd, max_size=64, chunk_size=16)
+    os.write(write_fd, b"x" * 200 + b"{ready3}\nsmall{ready4}\n")
+    with pytest.raises(ResponseTooLarge) as error:
+        reader.read()
+    assert error.value.sequence == 3
+    assert reader.read() == (4, b"small")
+
+
+def test_end_of_output_returns_none():
+    """None is returned when ExifTool closes its output."""
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b"partial")
+    os.close(write_fd)
+    try:
+        assert ResponseReader(read_fd).read() is None
+    finally:
+        os.close(read_fd)
+
+
+@pytest.fixture
+def fake_exiftool(tmp_path, monkeypatch):
+    """Put a fake ExifTool first in the PATH."""
+    script = tmp_path / "exiftool"
+    script.write_text(f"#!{sys.executable}\n{FAKE_EXIFTOOL}")
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_unreadable_files_have_no_metadata(fake_exiftool):
+    """An empty response, for unreadable files, is an empty list."""
+    with PipelinedExifTool() as exiftool:
+        assert exiftool.get_metadata("bad.jpg").result(5) == []
+        assert exiftool.get_metadata("IMG_1.jpg").result(5) == [
+            {"SourceFile": "IMG_1.jpg"}
+        ]
+    with ExifToolPool(2) as pool:
+        files = ["bad1.jpg", "bad2.jpg", "IMG_3.jpg", "bad4.jpg"]
+        result = list(pool.iter_metadata(files, batch_size=2))
+    assert result == [{"SourceFile": "IMG_3.jpg"}]
+
+
+def test_requests_fail_when_exiftool_exits(fake_exiftool):
+    """Pending and new requests fail if ExifTool exits."""
+    exiftool = PipelinedExifTool()
+    exiftool.start()
+    try:
+        with pytest.raises(Exception, match="terminated"):
+            exiftool.get_metadata("crash").result(5)
+        with pytest.raises(Exception):
+            exiftool.get_metadata("IMG_1.jpg").result(5)
+    finally:
+        exiftool.terminate()
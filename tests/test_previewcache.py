@@ -0,0 +1,76 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test PreviewCache keys and size accounting."""
+
+import os
+
+from photosuite.util.previewcache import PreviewCache, _Usage
+
+
+def write(path, data, mtime=None):
+    """Write a file, optionally setting its modification time."""
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_key_covers_the_whole_content(tmp_path):
+    """Files differing anywhere have different keys, copies share it."""
+    data = bytes(range(256)) * 4096
+    changed = bytearray(data)
+    changed[len(data) // 2] ^= 0xFF
+    first = write(tmp_path / "a.cr2", data)
+    copy = write(tmp_path / "b.cr2", data)
+    other = write(tmp_path / "c.cr2", bytes(changed))
+    assert PreviewCache.content_key(first) == PreviewCache.content_key(copy)
+    assert PreviewCache.content_key(first) != PreviewCache.content_key(other)
+
+
+def test_key_follows_file_changes(tmp_path):
+    """A file changed in place, keeping its size, gets a new key."""
+    path = tmp_path / "a.cr2"
+    before = PreviewCache.content_key(write(path, b"a" * 1000, 1000))
+    after = PreviewCache.content_key(write(path, b"b" * 1000, 2000))
+    assert before != after
+
+
+def test_max_bytes_option(tmp_path):
+    """The maximum size can be given and changed."""
+    cache = PreviewCache(None, str(tmp_path), max_bytes=1000)
+    try:
+        assert cache.max_bytes == 1000
+        cache.max_bytes = 2000
+        assert cache.max_bytes == 2000
+    finally:
+        cache.shutdown()
+
+
+def test_usage_evicts_least_recently_used(tmp_path):
+    """Old entries are evicted, and the directory is scanned once."""
+    (tmp_path / "aa").mkdir()
+    write(tmp_path / "aa" / "aa1_256.jpg", b"x" * 400, 1000)
+    write(tmp_path / "aa" / "aa1.json", b"{}", 1000)
+    write(tmp_path / "aa" / "aa2_256.jpg", b"x" * 400, 2000)
+    write(tmp_path / "aa" / "aa2.json", b"{}", 2000)
+    usage = _Usage(str(tmp_path), max_bytes=1000)
+    assert usage.added("aa2", 402) == []
+    usage.used("aa1")
+    (tmp_path / "aa" / "aa1_256.jpg").unlink()
+    assert usage.added("aa3", 300) == ["aa2"]
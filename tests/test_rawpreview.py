@@ -0,0 +1,87 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test extraction of JPEG previews embedded in RAW files."""
+
+import struct
+
+from photosuite.util.rawpreview import embedded_jpeg
+
+JPEG = b"\xff\xd8\xff\xe0\x00\x04ab\xff\xc0\x00\x04xy\xff\xd9"
+LOSSLESS = b"\xff\xd8\xff\xc3\x00\x04xy\xff\xd9"
+
+
+def tiff(order, *images):
+    """Create a TIFF file with an IFD chain referencing JPEG images."""
+    header = (b"II*\0" if order == "<" else b"MM\0*") + struct.pack(
+        order + "I", 8
+    )
+    ifd_size = 2 + 2 * 12 + 4
+    data_offset = 8 + ifd_size * len(images)
+    ifds, data = b"", b""
+    for index, image in enumerate(images):
+        next_ifd = 0 if index == len(images) - 1 else 8 + ifd_size * (index + 1)
+        ifds += struct.pack(order + "H", 2)
+        ifds += struct.pack(order + "HHII", 513, 4, 1, data_offset + len(data))
+        ifds += struct.pack(order + "HHII", 514, 4, 1, len(image))
+        ifds += struct.pack(order + "I", next_ifd)
+        data += image
+    return header + ifds + data
+
+
+def test_largest_jpeg_little_endian(tmp_path):
+    """The largest displayable JPEG of the IFD chain is returned."""
+    large = JPEG[:-2] + b"\0" * 32 + b"\xff\xd9"
+    path = tmp_path / "image.cr2"
+    path.write_bytes(tiff("<", JPEG, large))
+    assert bytes(embedded_jpeg(str(path))) == large
+
+
+def test_big_endian(tmp_path):
+    """Big endian TIFF files are supported."""
+    path = tmp_path / "image.nef"
+    path.write_bytes(tiff(">", JPEG))
+    assert bytes(embedded_jpeg(str(path))) == JPEG
+
+
+def test_lossless_jpeg_is_ignored(tmp_path):
+    """Lossless JPEG (RAW data) is not a displayable preview."""
+    path = tmp_path / "image.dng"
+    path.write_bytes(tiff("<", LOSSLESS))
+    assert embedded_jpeg(str(path)) is None
+
+
+def test_raf_header(tmp_path):
+    """Fujifilm RAF files reference the JPEG from their header."""
+    header = b"FUJIFILMCCD-RAW".ljust(84, b"\0")
+    offset = len(header) + 8
+    path = tmp_path / "image.raf"
+    path.write_bytes(header + struct.pack(">II", offset, len(JPEG)) + JPEG)
+    assert bytes(embedded_jpeg(str(path))) == JPEG
+
+
+def test_unsupported_and_broken_files(tmp_path):
+    """Unknown, empty and truncated files have no preview."""
+    unknown = tmp_path / "image.png"
+    unknown.write_bytes(b"\x89PNG\r\n\x1a\n")
+    empty = tmp_path / "empty.cr2"
+    empty.write_bytes(b"")
+    truncated = tmp_path / "truncated.cr2"
+    truncated.write_bytes(tiff("<", JPEG)[:20])
+    for path in [unknown, empty, truncated]:
+        assert embedded_jpeg(str(path)) is None
@@ -0,0 +1,100 @@
+# tether: GTK+ interface to control cameras using libgphoto2.
+# Copyright (C) 2019  Rafael Guterres Jeffman
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Test SequenceAllocator."""
+
+from multiprocessing import Pool
+
+from photosuite.util.sequence import (
+    SequenceAllocator,
+    get_allocator,
+    template_pattern,
+)
+
+
+def test_template_pattern_captures_first_sequence():
+    """Only the first sequence field is captured, other fields match text."""
+    pattern = template_pattern("{session}_{seq:04d}.{ext}")
+    match = pattern.fullmatch("studio_0042.cr2")
+    assert match is not None
+    assert match.group("seq") == "0042"
+    assert pattern.fullmatch("studio.cr2") is None
+
+
+def test_reserve_continues_after_existing_files(tmp_path):
+    """Numbers continue after the highest sequence in the directory."""
+    for name in ["IMG_0007.jpg", "IMG_0003.jpg", "other.jpg"]:
+        (tmp_path / name).write_bytes(b"")
+    allocator = SequenceAllocator(str(tmp_path), "IMG_{seq:04d}.{ext}")
+    try:
+        assert allocator.reserve() == 8
+        assert allocator.reserve(3) == 9
+        assert allocator.last == 11
+    finally:
+        allocator.close()
+
+
+def test_journal_survives_restart(tmp_path):
+    """A new allocator continues from the journal, not from the files."""
+    first = SequenceAllocator(str(tmp_path), "{seq}.jpg")
+    first.reserve(5)
+    first.close()
+    second = SequenceAllocator(str(tmp_path), "{seq}.jpg")
+    try:
+        assert second.reserve() == 6
+    finally:
+        second.close()
+
+
+def test_claim_and_claim_unique(tmp_path):
+    """Names found in the directory, or claimed before, are taken."""
+    (tmp_path / "shot.jpg").write_bytes(b"")
+    allocator = SequenceAllocator(str(tmp_path), "shot.{ext}")
+    try:
+        assert allocator.is_taken("shot.jpg")
+        assert not allocator.claim("shot.jpg")
+        assert allocator.claim("new.jpg")
+        assert allocator.claim_unique("shot.jpg") == "shot-1.jpg"
+        assert allocator.claim_unique("shot.jpg") == "shot-2.jpg"
+        assert allocator.claim_unique("free.jpg") == "free.jpg"
+    finally:
+        allocator.close()
+
+
+def test_get_allocator_is_shared(tmp_path):
+    """The same allocator is used for the same directory and template."""
+    first = get_allocator(str(tmp_path), "{seq}.jpg")
+    assert get_allocator(str(tmp_path / "."), "{seq}.jpg") is first
+    assert get_allocator(str(tmp_path), "{seq}.png") is not first
+
+
+def _reserve_many(directory):
+    """Reserve numbers in another process."""
+    allocator = SequenceAllocator(directory, "{seq}.jpg")
+    try:
+        return [allocator.reserve() for _ in range(50)]
+    finally:
+        allocator.close()
+
+
+def test_processes_never_share_numbers(tmp_path):
+    """Numbers reserved concurrently by several processes are unique."""
+    with Pool(4) as pool:
+        results = pool.map(_reserve_many, [str(tmp_path)] * 4)
+    numbers = [number for result in results for number in result]
+    assert sorted(numbers) == list(range(1, 201))
@@ -17,10 +17,12 @@
 
 """Monitors a directory and display new images."""
 
+import os
 import sys
 import time
-import io
-from queue import Queue
+from collections import OrderedDict
+from functools import partial
+from queue import Queue, Empty
 from threading import Thread
 
 # pylint: disable=import-error
@@ -30,16 +32,25 @@ from watchdog.events import FileSystemEventHandler
 # pylint: enable=import-error
 
 from PIL import Image
-from magic import Magic
 
 import gi
 
 gi.require_version("Gtk", "3.0")
 
 # pylint: disable=wrong-import-position
-from gi.repository import Gtk, Gdk, GdkPixbuf  # noqa F402
-
-from photosuite.util.phexif import ExifTool  # noqa: E402
+from gi.repository import Gdk, Gtk, GLib  # noqa F402
+
+from photosuite.util.phexif import ExifToolPool  # noqa: E402
+from photosuite.util.metadatacache import (  # noqa: E402
+    MetadataCache,
+    default_database,
+)
+from photosuite.ui.imagepipeline import (  # noqa: E402
+    DisplayImage,
+    ImagePipeline,
+    to_pixbuf,
+)
+from photosuite.ui.rendercache import RenderCache  # noqa: E402
 
 # pylint: enable=wrong-import-position
 
@@ -48,20 +59,31 @@ queue = Queue()
 last_image = None  # pylint: disable=invalid-name
 img_win = None  # pylint: disable=invalid-name
 
-mime = Magic(True)
-exif = ExifTool()
+viewport = [768, 576]
+rerender = {}
+redraw_pending = []
+render_cache = RenderCache()
+
+exif = ExifToolPool(2)
 exif.start()
+metadata_cache = MetadataCache(exif, database=default_database())
+screen = Gdk.Screen.get_default()
+pipeline = ImagePipeline(
+    metadata_cache,
+    exif,
+    previews={
+        "sizes": (256, 1024, max(screen.get_width(), screen.get_height()))
+    },
+)
 
 
 def get_image_pixbuf(image):
     """Given the image, get its contents as a GdkPixbuf."""
-    if isinstance(image, Image.Image):
-        with io.BytesIO() as data:
-            image.save(data, "jpeg")
-            loader = GdkPixbuf.PixbufLoader.new_with_type("jpeg")
-            loader.write(data.getvalue())
-            data = loader.get_pixbuf()
-            loader.close()
+    if isinstance(image, DisplayImage):
+        data = image.pixbuf
+    elif isinstance(image, Image.Image):
+        rgb = image.mode in ("RGB", "RGBA")
+        data = to_pixbuf(image if rgb else image.convert("RGB"))
     elif isinstance(image, Gtk.Image):
         data = image.get_pixbuf()
     else:
@@ -74,27 +96,33 @@ def update_image_ui(drawing_area, cairo_context):
     if last_image is not None:
         # pylint: disable=invalid-name
         img_win.activate()
-        data = get_image_pixbuf(last_image)
-        iw, ih = data.get_width(), data.get_height()
+        render_cache.source = get_image_pixbuf(last_image)
         w = drawing_area.get_allocated_width()
         h = drawing_area.get_allocated_height()
-        r = min(w / iw, h / ih)
-        rw, rh = int(iw * r), int(ih * r)
-        if w < iw or h < ih:
-            interp = GdkPixbuf.InterpType.BILINEAR
-            data = GdkPixbuf.Pixbuf.scale_simple(data, rw, rh, interp)
-        else:
-            rw, rh = iw, ih
-        x, y = 0, 0
-        if rw < w or rh < h:
-            x = w // 2 - rw // 2
-            y = h // 2 - rh // 2
-        Gdk.cairo_set_source_pixbuf(cairo_context, data, x, y)
-        cairo_context.paint()
+        viewport[:] = w, h
+        iw, ih = last_image.pixbuf.get_width(), last_image.pixbuf.get_height()
+        sw, sh = last_image.source_size
+        grown = (w > iw or h > ih) and (sw > iw and sh > ih)
+        if grown and rerender.get(last_image.filename) != (w, h):
+            # The window grew, and the image has more pixels to show.
+            rerender[last_image.filename] = (w, h)
+            if request_image(last_image.filename, block=False) is None:
+                # The pipeline is busy, never wait for it while drawing.
+                del rerender[last_image.filename]
+                if not redraw_pending:
+                    redraw_pending.append(GLib.timeout_add(100, redraw_later))
+        render_cache.paint(cairo_context, w, h)
         # pylint: enable=invalid-name
     return False
 
 
+def redraw_later():
+    """Redraw the image window, from a GLib timeout."""
+    redraw_pending.clear()
+    img_win.queue_draw()
+    return False
+
+
 def create_image_window():
     """Create window."""
     width, height = 1024, 768
@@ -112,38 +140,67 @@ def create_image_window():
     return _win
 
 
-def picture_taken(fname):
-    """Handle new frame signal."""
+def is_image(fname):
+    """Check if a file is an image."""
+    try:
+        return pipeline.sniff(fname).is_image
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+def request_image(fname, callback=None, block=True):
+    """Prepare an image to be displayed with the current viewport size."""
+    return pipeline.submit(
+        fname,
+        tuple(viewport),
+        callback or partial(image_ready, fname),
+        block=block,
+    )
+
+
+def image_ready(fname, request):
+    """Display an image prepared by the pipeline."""
+    try:
+        result = request.result()
+    except Exception as exception:  # pylint: disable=broad-except
+        print(f"Failed to display image {fname}.\nError: {str(exception)}")
+        return
+    if result is not None:
+        GLib.idle_add(show_image, result)
+
+
+def show_image(result):
+    """Replace the displayed image, unless a newer one is displayed."""
     global last_image  # pylint: disable=invalid-name,global-statement
-    pil = ("image/jpeg", "image/tiff", "image/gif", "image/png")
-    mime_type = mime.from_file(fname)  # pylint: disable=no-member
-    if mime_type.startswith("image/"):
-        try:
-            metadata = exif.get_metadata(fname)[0]
-            key = "EXIF:Orientation"
-            rotation = [0, 0, 0, 180, 0, 0, -90, 0, 90]
-            orientation = rotation[int(metadata[key])] if key in metadata else 0
-            if mime_type in pil:
-                last_image = Image.open(fname)
-            else:
-                reader = io.BytesIO(exif.get_image_preview(fname))
-                last_image = Image.open(reader)
-            last_image = last_image.rotate(orientation, expand=True)
-            img_win.queue_draw()
-        except Exception as exception:  # pylint: disable=broad-except
-            print(
-                f"Failed to display image {fname} ({mime_type}).\n"
-                + f"Error: {str(exception)}"
-            )
+    if last_image is None or result.sequence > last_image.sequence:
+        rerender.clear()
+        last_image = result
+        img_win.queue_draw()
+    return False
 
 
 class FileThread(Thread):
-    """Thread that handles filesystem events."""
+    """
+    Thread that handles filesystem events.
+
+    Events that arrive while images are being handled are coalesced:
+    duplicate paths are handled once, only the newest image is sent to
+    the display pipeline, and metadata is read and previews are built
+    for the others, so they are cached.
+    """
 
     def __init__(self):
         """Initialie thread object."""
         super().__init__()
         self.keep_running = False
+        self.coalesced = 0
+        self.skipped = 0
+        self.lag = 0.0
+
+    @property
+    def depth(self):
+        """Query the number of events waiting to be handled."""
+        return queue.qsize()
 
     def start(self):
         """Start running thread."""
@@ -153,28 +210,74 @@ class FileThread(Thread):
     def run(self):
         """Thread entry point."""
         while self.keep_running:
-            while queue.empty() and self.keep_running:
-                time.sleep(1)
-            if self.keep_running:
-                file, closed = queue.get()
-                if closed:
-                    picture_taken(file)
-                queue.task_done()
+            event = queue.get()
+            if event is not None:
+                self.__handle(self.__coalesce(*event))
+
+    def __coalesce(self, path, timestamp):
+        """Collect pending events, keeping the first time a path was seen."""
+        events = OrderedDict([(path, timestamp)])
+        count = 1
+        try:
+            while self.keep_running:
+                event = queue.get_nowait()
+                if event is not None:
+                    count += 1
+                    events[event[0]] = events.pop(*event)
+        except Empty:
+            pass
+        self.coalesced += count - len(events)
+        return events
+
+    def __handle(self, events):
+        """Display the newest image, and prepare the others."""
+        paths = list(events)
+        while paths:
+            path = paths.pop()
+            if is_image(path):
+                request_image(path, partial(self.__ready, path, events[path]))
+                break
+        for path in paths:
+            self.skipped += 1
+            try:
+                if is_image(path):
+                    pipeline.orientation(path)
+                    pipeline.previews.schedule(path)
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def __ready(self, fname, timestamp, request):
+        """Display the newest image, and record the display lag."""
+        self.lag = time.monotonic() - timestamp
+        image_ready(fname, request)
 
     def stop(self):
         """Stop running thread."""
         self.keep_running = False
-        queue.join()
+        queue.put(None)
+        self.join()
 
 
 class MonitorEvent(FileSystemEventHandler):
     """Implement file system event hander."""
 
-    # pylint: disable=too-few-public-methods
-    def on_closed(self, event):  # pylint: disable=no-self-use
+    # pylint: disable=no-self-use
+    def on_closed(self, event):
         """On closed event."""
         if not event.is_directory:
-            queue.put((event.src_path, True))
+            MonitorEvent.__queue(event.src_path)
+
+    def on_moved(self, event):
+        """On moved event, files written atomically are moved into place."""
+        if not event.is_directory:
+            MonitorEvent.__queue(event.dest_path)
+
+    @staticmethod
+    def __queue(path):
+        """Queue a file to be displayed, ignoring temporary files."""
+        name = os.path.basename(path)
+        if not (name.startswith(".") and name.endswith(".part")):
+            queue.put((path, time.monotonic()))
 
 
 if __name__ == "__main__":
@@ -194,3 +297,5 @@ if __name__ == "__main__":
         observer.stop()
         observer.join()
         thread.stop()
+        pipeline.shutdown()
+        exif.terminate()